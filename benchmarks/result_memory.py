@@ -0,0 +1,67 @@
+"""Measure the memory used per validation result.
+
+Compares the current slotted :class:`ImageValidationResult` against the
+previous plain dataclass layout holding a fresh ``reasons`` list per frame.
+
+    python benchmarks/result_memory.py --frames 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from timelapse_tool.validate import ImageValidationResult  # noqa: E402
+
+
+@dataclass
+class LegacyResult:
+    path: Path
+    timestamp: Optional[datetime]
+    size_bytes: int
+    readable: bool
+    width: Optional[int]
+    height: Optional[int]
+    reasons: List[str]
+    is_flat: bool = False
+
+
+def _measure(factory: Callable[..., object], frames: int) -> float:
+    folder = Path("/data/metro")
+    start = datetime(2023, 1, 1)
+    # the paths and timestamps are identical for both layouts, so they are
+    # created before tracing starts and only the record overhead is measured
+    paths = [folder / f"metroLocal_IPC_main_{i:014d}.jpg" for i in range(frames)]
+    stamps = [start + timedelta(seconds=10 * i) for i in range(frames)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = [
+        factory(p, ts, 250_000, True, 3840, 2160, [] if i % 50 else ["unreadable"])
+        for i, (p, ts) in enumerate(zip(paths, stamps))
+    ]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del results
+    return used / frames
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100_000)
+    args = parser.parse_args()
+    legacy = _measure(LegacyResult, args.frames)
+    current = _measure(ImageValidationResult, args.frames)
+    print(f"legacy dataclass: {legacy:.0f} bytes/frame")
+    print(f"slotted result:   {current:.0f} bytes/frame")
+    print(f"saving:           {100 * (1 - current / legacy):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
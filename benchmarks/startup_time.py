@@ -0,0 +1,69 @@
+"""Measure the start-up time of the command line tool.
+
+Compares importing the CLI with OpenCV and NumPy loaded up front, as every
+command did before, against the lazy imports, and times ``--help`` and a
+``report-gaps --no-decode`` run on a small generated folder.  Each case
+runs in a fresh interpreter; the median of ``--repeat`` runs is shown.
+
+    python benchmarks/startup_time.py --repeat 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _median_seconds(argv: List[str], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _write_folder(folder: Path, frames: int) -> None:
+    # --no-decode only looks at names and sizes, so the content is filler
+    start = datetime(2023, 1, 1)
+    for i in range(frames):
+        ts = start + timedelta(minutes=i + 15 * (i >= frames // 2))
+        (folder / f"metroLocal_IPC_main_{ts:%Y%m%d%H%M%S}.jpg").write_bytes(b"\xff" * 6000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--frames", type=int, default=1000)
+    args = parser.parse_args()
+    py = sys.executable
+    with tempfile.TemporaryDirectory() as tmp:
+        _write_folder(Path(tmp), args.frames)
+        cases = [
+            ("python only", [py, "-c", "pass"]),
+            (
+                "import cli + numpy + cv2 (eager)",
+                [py, "-c", "import numpy, cv2, timelapse_tool.cli"],
+            ),
+            ("import cli (lazy)", [py, "-c", "import timelapse_tool.cli"]),
+            ("--help", [py, "timelapse_tool.py", "--help"]),
+            (
+                f"report-gaps --no-decode ({args.frames} files)",
+                [py, "timelapse_tool.py", "--image-folder", tmp, "report-gaps", "--no-decode"],
+            ),
+        ]
+        for label, argv in cases:
+            print(f"{label:<40} {1000 * _median_seconds(argv, args.repeat):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from timelapse_tool.batch import Job, job_argv, load_jobs, run_batch
+from timelapse_tool.cli import build_parser
+
+
+def test_job_argv():
+    job = Job("cam", "build", {"image_folder": "/cam", "output_video": "o.mp4", "strict": True})
+    assert job_argv(job) == ["--image-folder", "/cam", "build", "--output-video", "o.mp4", "--strict"]
+    job = Job("cam", "build", {"output": ["a.mp4", "b.mp4,size=64x36"]})
+    argv = job_argv(job)
+    assert argv == ["build", "--output", "a.mp4", "--output", "b.mp4,size=64x36"]
+    assert len(build_parser().parse_args(["--image-folder", "/cam", *argv]).output) == 2
+
+
+def test_run_options_rejected_in_jobs(tmp_path: Path):
+    jobs_file = tmp_path / "jobs.json"
+    jobs_file.write_text(json.dumps([{"command": "check", "log-level": "DEBUG"}]))
+    with pytest.raises(ValueError, match="log_level applies to the whole batch"):
+        load_jobs(jobs_file)
+    jobs_file.write_text(json.dumps({"defaults": {"workers": 4}, "jobs": [{"command": "check"}]}))
+    with pytest.raises(ValueError, match="workers is set by the shared pool"):
+        load_jobs(jobs_file)
+
+
+def test_run_batch(sample_dataset: Path, tmp_path_factory):
+    root = tmp_path_factory.mktemp("cameras")
+    for cam in ("cam1", "cam2"):
+        shutil.copytree(sample_dataset, root / cam)
+    jobs_file = root / "jobs.json"
+    jobs_file.write_text(json.dumps({
+        "defaults": {"min-bytes": 0},
+        "jobs": [
+            {"name": "c1", "command": "check", "image_folder": str(root / "cam1"),
+             "report_out": str(root / "c1.jsonl")},
+            {"name": "g2", "command": "report-gaps", "image_folder": str(root / "cam2")},
+            {"name": "b1", "command": "build", "image_folder": str(root / "cam1"),
+             "output_video": str(root / "b1.mp4")},
+            {"name": "bad", "command": "check", "image_folder": str(root / "cam2"),
+             "no_such_option": 1},
+        ],
+    }))
+    results = run_batch(load_jobs(jobs_file), build_parser().parse_args, workers=2)
+    assert [(r.name, r.status) for r in results] == [
+        ("c1", "ok"), ("g2", "ok"), ("b1", "ok"), ("bad", "error")
+    ]
+    assert len((root / "c1.jsonl").read_text().splitlines()) == 5
+    assert (root / "b1.mp4").stat().st_size > 0
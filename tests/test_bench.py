@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import re
+from functools import partial
+from pathlib import Path
+
+from timelapse_tool.bench import DatasetSpec, compare, generate_dataset, run_bench
+from timelapse_tool.validate import scan_folder
+from .conftest import PATTERN, FORMAT
+
+
+def test_generate_and_bench(tmp_path: Path):
+    spec = DatasetSpec(frames=40, width=64, height=48, gap_rate=0.05, corrupt_rate=0.1, seed=3)
+    stats = generate_dataset(tmp_path, spec)
+    assert stats.written == len(list(tmp_path.iterdir())) == 40
+    # the same spec yields the same folder
+    assert generate_dataset(tmp_path / "again", spec) == stats
+
+    scan = partial(scan_folder, tmp_path, re.compile(PATTERN), FORMAT, min_bytes=0)
+    result = run_bench(scan, gap_minutes=5)
+    data = result.to_dict()
+    assert list(data["stages"]) == ["scan", "gaps", "sample", "build"]
+    assert data["stages"]["scan"]["items"] == 40
+    assert data["stages"]["build"]["items"] == 40 - stats.corrupt
+    assert compare(data, data, max_slowdown=1.0) == []
+    slow = {"stages": {"scan": {**data["stages"]["scan"], "per_second": 1e-9}}}
+    assert compare(slow, data, max_slowdown=2.0) == ["scan"]
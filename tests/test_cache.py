@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from timelapse_tool.cache import DEFAULT_CACHE_NAME, ValidationCache, cache_params
+from timelapse_tool.validate import scan_folder
+from .conftest import PATTERN, FORMAT
+
+
+def test_cache_reuses_unchanged_files(sample_dataset: Path):
+    pattern = re.compile(PATTERN)
+    params = cache_params(pattern, FORMAT, 0, None, False)
+    db = sample_dataset / DEFAULT_CACHE_NAME
+    with ValidationCache(db, params) as cache:
+        first = scan_folder(sample_dataset, pattern, FORMAT, min_bytes=0, cache=cache)
+        assert cache.misses == len(first)
+    (sample_dataset / "random.txt").write_text("changed content")
+    with ValidationCache(db, params) as cache:
+        second = scan_folder(sample_dataset, pattern, FORMAT, min_bytes=0, cache=cache)
+        assert cache.hits == len(first) - 1 and cache.misses == 1
+    assert [r.path.name for r in second] == [r.path.name for r in first]
+    assert [(r.timestamp, r.reasons, r.width) for r in second] == [
+        (r.timestamp, r.reasons, r.width) for r in first
+    ]
+
+
+def test_default_cache_is_not_scanned_later(sample_dataset: Path):
+    pattern = re.compile(PATTERN)
+    plain = scan_folder(sample_dataset, pattern, FORMAT, min_bytes=0)
+    params = cache_params(pattern, FORMAT, 0, None, False)
+    with ValidationCache(sample_dataset / DEFAULT_CACHE_NAME, params) as cache:
+        scan_folder(sample_dataset, pattern, FORMAT, min_bytes=0, cache=cache)
+    (sample_dataset / (DEFAULT_CACHE_NAME + "-journal")).write_bytes(b"")
+    # a later scan without --cache must not see the database or its journal
+    again = scan_folder(sample_dataset, pattern, FORMAT, min_bytes=0)
+    assert [r.path.name for r in again] == [r.path.name for r in plain]
+
+
+def test_recursive_cache_keys_on_relative_path(tmp_path: Path):
+    name = "metroLocal_IPC_main_20230101000000.jpg"
+    good = tmp_path / "2023" / "01" / "01" / name
+    bad = tmp_path / "2023" / "01" / "02" / name
+    good.parent.mkdir(parents=True)
+    bad.parent.mkdir(parents=True)
+    cv2.imwrite(str(good), np.full((20, 20, 3), 128, dtype=np.uint8))
+    # same name, size and mtime, but not a JPEG
+    bad.write_bytes(b"x" * good.stat().st_size)
+    os.utime(bad, ns=(good.stat().st_atime_ns, good.stat().st_mtime_ns))
+    pattern = re.compile(PATTERN)
+    params = cache_params(pattern, FORMAT, 0, None, False)
+    db = tmp_path / DEFAULT_CACHE_NAME
+
+    def scan() -> list:
+        with ValidationCache(db, params, root=tmp_path) as cache:
+            results = scan_folder(
+                tmp_path, pattern, FORMAT, min_bytes=0, cache=cache, recursive=True
+            )
+        return [(r.path, r.is_valid) for r in results]
+
+    first = scan()
+    assert first == [(good, True), (bad, False)]
+    assert scan() == first
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import subprocess
 import sys
 
@@ -36,3 +37,126 @@ def test_cli_build_and_gaps(sample_dataset: Path):
     ])
     assert res2.returncode == 0
     assert "15.0" in res2.stdout
+
+
+def test_cli_test_dataset_exit_report(sample_dataset: Path, tmp_path_factory):
+    out = tmp_path_factory.mktemp("reports")
+    res = run_tool([
+        "--image-folder",
+        str(sample_dataset),
+        "--report-out",
+        str(out / "images.csv"),
+        "test-dataset",
+        "--min-bytes",
+        "0",
+        "--gap-report-out",
+        str(out / "gaps.json"),
+        "--exit-report",
+        str(out / "exit.json"),
+    ])
+    assert res.returncode == 1
+    data = json.loads((out / "exit.json").read_text())
+    assert data["status"] == "fail" and data["gaps"] == 1
+    assert data["summary"]["total"] == 5
+    assert len(json.loads((out / "gaps.json").read_text())) == 1
+    assert (out / "images.csv").read_text().count("\n") == 6
+
+
+def test_cli_no_decode_never_loads_opencv(sample_dataset: Path):
+    code = (
+        "import sys; from timelapse_tool.cli import main; "
+        f"code = main(['--image-folder', {str(sample_dataset)!r}, 'report-gaps', "
+        "'--min-bytes', '0', '--no-decode']); "
+        "assert 'cv2' not in sys.modules and 'numpy' not in sys.modules; sys.exit(code)"
+    )
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert res.returncode == 0, res.stderr
+    assert "15.0" in res.stdout
+
+    res2 = run_tool(["--image-folder", str(sample_dataset), "report-gaps", "--no-decode", "--deep"])
+    assert res2.returncode != 0
+    assert "--deep" in res2.stderr
+
+
+def test_cli_rejects_negative_workers(sample_dataset: Path):
+    res = run_tool(["--image-folder", str(sample_dataset), "check", "--workers", "-1"])
+    assert res.returncode == 2
+    assert "worker count must be >= 0" in res.stderr
+    assert "Traceback" not in res.stderr
+
+
+def test_cli_build_rejects_ignored_scan_options(sample_dataset: Path):
+    base = ["--image-folder", str(sample_dataset), "build", "--output-video", "x.mp4", "--dry-run"]
+    for extra, message in (
+        (["--deep"], "--deep"),
+        (["--quality"], "--quality"),
+        (["--frozen-frames", "5"], "--drop-frozen"),
+    ):
+        res = run_tool([*base, *extra])
+        assert res.returncode == 1
+        assert message in res.stderr
+
+
+def test_cli_watch_has_no_folder_scan_options(sample_dataset: Path):
+    res = run_tool(["--image-folder", str(sample_dataset), "watch", "--recursive", "--duration", "0"])
+    assert res.returncode == 2
+    assert "unrecognized arguments: --recursive" in res.stderr
+
+    code = "import sys, timelapse_tool.watch; assert 'cv2' not in sys.modules"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_cli_rejects_bad_output_specs(sample_dataset: Path):
+    for spec in ("x.mp4,size=abc", "x.mp4,fps=fast", "x.mp4,bitrate=1"):
+        res = run_tool(["--image-folder", str(sample_dataset), "build", "--output", spec])
+        assert res.returncode == 2, spec
+        assert "Traceback" not in res.stderr
+    for command in ("build", "watch", "bench"):
+        res = run_tool(["--image-folder", str(sample_dataset), command, "--resize", "abc"])
+        assert res.returncode == 2, command
+        assert "invalid size 'abc'" in res.stderr
+
+
+def test_cli_check_report_inside_image_folder(sample_dataset: Path):
+    report = sample_dataset / "report.csv"
+    res = run_tool([
+        "--image-folder",
+        str(sample_dataset),
+        "--report-out",
+        str(report),
+        "--log-level",
+        "INFO",
+        "check",
+        "--min-bytes",
+        "0",
+    ])
+    assert res.returncode == 0
+    rows = report.read_text().splitlines()[1:]
+    assert len(rows) == 5
+    assert not any(row.startswith("report.csv,") for row in rows)
+    assert "scanned 5 files" in res.stderr
+
+
+def test_cli_target_seconds_writes_requested_frames(sample_dataset: Path, tmp_path_factory):
+    out = tmp_path_factory.mktemp("video") / "out.avi"
+    res = run_tool([
+        "--image-folder",
+        str(sample_dataset),
+        "--log-level",
+        "INFO",
+        "build",
+        "--min-bytes",
+        "0",
+        "--output-video",
+        str(out),
+        "--codec",
+        "MJPG",
+        "--fps",
+        "5",
+        "--sample-mode",
+        "count",
+        "--target-seconds",
+        "4",
+    ])
+    assert res.returncode == 0, res.stderr
+    assert "wrote 20 frames" in res.stderr
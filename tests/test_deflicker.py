@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from timelapse_tool import video
+from timelapse_tool.deflicker import deflicker_gains, gain_lut, target_curve
+from timelapse_tool.validate import scan_folder
+from .conftest import PATTERN, FORMAT
+
+
+def test_target_curve_is_centred_rolling_mean():
+    brightness = np.array([10.0, 20.0, 30.0, np.nan, 50.0])
+    curve = target_curve(brightness, 3)
+    # windows shrink at the ends and skip the missing value
+    assert curve.tolist() == [15.0, 20.0, 25.0, 40.0, 50.0]
+
+
+def test_gains_are_clipped_and_default_to_one():
+    brightness = np.array([100.0, 20.0, 100.0, np.nan, 0.0])
+    gains = deflicker_gains(brightness, window=3, max_gain=2.0)
+    assert gains[1] == 2.0
+    assert gains[3] == gains[4] == 1.0
+    with pytest.raises(ValueError):
+        deflicker_gains(brightness, window=0)
+
+
+def test_gain_lut_saturates():
+    lut = gain_lut(1.5)
+    assert lut.dtype == np.uint8
+    assert lut[100] == 150 and lut[255] == 255
+
+
+def test_build_evens_out_flicker(tmp_path: Path):
+    start = datetime(2023, 1, 1)
+    levels = [120, 60, 120, 60, 120, 60, 120]
+    for i, level in enumerate(levels):
+        arr = np.full((32, 32, 3), level, dtype=np.uint8)
+        name = f"metroLocal_IPC_main_{start + timedelta(minutes=i):{FORMAT}}.jpg"
+        cv2.imwrite(str(tmp_path / name), arr)
+    results = scan_folder(tmp_path, re.compile(PATTERN), FORMAT, min_bytes=0, quality=True)
+    out = tmp_path / "out.avi"
+    report = video.build_video(
+        results, out, fps=5, codec="MJPG", deflicker_window=len(levels)
+    )
+    assert report.frames_written == len(levels)
+    cap = cv2.VideoCapture(str(out))
+    means = []
+    ok, frame = cap.read()
+    while ok:
+        means.append(frame.mean())
+        ok, frame = cap.read()
+    cap.release()
+    assert np.ptp(means) < 10 < np.ptp(levels)
+
+    unmeasured = scan_folder(tmp_path, re.compile(PATTERN), FORMAT, min_bytes=0)
+    with pytest.raises(ValueError):
+        video.build_video(unmeasured, out, fps=5, codec="MJPG", deflicker_window=3)
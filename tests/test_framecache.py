@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from timelapse_tool import video
+from timelapse_tool.framecache import FrameCache
+from timelapse_tool.validate import ImageValidationResult
+
+
+def _make_img(path: Path, ts: datetime) -> ImageValidationResult:
+    return ImageValidationResult(
+        path=path,
+        timestamp=ts,
+        size_bytes=path.stat().st_size,
+        readable=True,
+        width=32,
+        height=24,
+        reasons=[],
+    )
+
+
+def test_repeat_build_reads_cached_frames(tmp_path: Path, monkeypatch):
+    start = datetime(2023, 1, 1, 23, 58)
+    images = []
+    for i in range(4):
+        path = tmp_path / f"{i}.jpg"
+        cv2.imwrite(str(path), np.full((24, 32, 3), 40 * i, dtype=np.uint8))
+        images.append(_make_img(path, start + timedelta(minutes=i)))
+
+    with FrameCache(tmp_path / "frames") as cache:
+        video.build_video(images, tmp_path / "a.avi", 5, "MJPG", size=(16, 12), frame_cache=cache)
+    assert cache.misses == 4
+    # the frames straddle midnight, so two day files are written
+    assert sorted(p.name for p in (tmp_path / "frames").glob("*.raw")) == [
+        "2023-01-01_16x12.raw",
+        "2023-01-02_16x12.raw",
+    ]
+
+    original = cv2.imread
+    calls = []
+    monkeypatch.setattr(video.cv2, "imread", lambda *a: calls.append(a) or original(*a))
+    with FrameCache(tmp_path / "frames") as cache:
+        frame = cache.get(images[2], (16, 12))
+        assert isinstance(frame, np.memmap) and frame.shape == (12, 16, 3)
+        report = video.build_video(
+            images, tmp_path / "b.avi", 10, "MJPG", (16, 12), frame_cache=cache, decode_workers=2
+        )
+    assert report.frames_written == 4 and calls == []
+
+
+def test_frame_cache_evicts_least_recently_used_day(tmp_path: Path):
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+    stride = frame.nbytes
+    for day in ("2023-01-01", "2023-01-02", "2023-01-03"):
+        with FrameCache(tmp_path) as cache:
+            ts = datetime.fromisoformat(day)
+            img = ImageValidationResult(Path(f"{day}.jpg"), ts, 1, True, 10, 10, [])
+            cache.put(img, frame)
+        # make the earliest day the least recently used one
+        index = tmp_path / f"{day}_10x10.json"
+        stamp = datetime.fromisoformat(day).timestamp()
+        os.utime(index, (stamp, stamp))
+    with FrameCache(tmp_path, max_bytes=2 * stride):
+        pass
+    kept = sorted(p.stem for p in tmp_path.glob("*.raw"))
+    assert kept == ["2023-01-02_10x10", "2023-01-03_10x10"]
+
+
+def test_frame_cache_recovers_from_torn_append(tmp_path: Path):
+    ts = datetime(2023, 1, 1, 12)
+    first = ImageValidationResult(Path("a.jpg"), ts, 1, True, 4, 4, [])
+    second = ImageValidationResult(Path("b.jpg"), ts + timedelta(minutes=1), 1, True, 4, 4, [])
+    with FrameCache(tmp_path) as cache:
+        cache.put(first, np.full((4, 4, 3), 100, dtype=np.uint8))
+    # a run killed half-way through writing a frame
+    with (tmp_path / "2023-01-01_4x4.raw").open("ab") as f:
+        f.write(b"\0" * 7)
+    with FrameCache(tmp_path) as cache:
+        cache.put(second, np.full((4, 4, 3), 200, dtype=np.uint8))
+    with FrameCache(tmp_path) as cache:
+        assert (cache.get(first, (4, 4)) == 100).all()
+        assert (cache.get(second, (4, 4)) == 200).all()
+
+
+def test_frame_cache_shared_between_caches(tmp_path: Path):
+    start = datetime(2023, 1, 1, 12)
+    images = [
+        ImageValidationResult(Path(f"{i}.jpg"), start + timedelta(minutes=i), 1, True, 4, 4, [])
+        for i in range(4)
+    ]
+    a, b = FrameCache(tmp_path), FrameCache(tmp_path)
+    for i, img in enumerate(images):
+        (a if i % 2 else b).put(img, np.full((4, 4, 3), i, dtype=np.uint8))
+    a.close()
+    b.close()
+    with FrameCache(tmp_path) as cache:
+        assert [int(cache.get(img, (4, 4))[0, 0, 0]) for img in images] == [0, 1, 2, 3]
+
+
+def test_frame_cache_key_ignores_time_zone(monkeypatch):
+    img = ImageValidationResult(Path("a.jpg"), datetime(2023, 3, 26, 2, 30), 1, True, 4, 4, [])
+    keys = set()
+    for tz in ("UTC", "Europe/Berlin", "America/New_York"):
+        monkeypatch.setenv("TZ", tz)
+        time.tzset()
+        keys.add(FrameCache._key(img))
+    monkeypatch.undo()
+    time.tzset()
+    assert keys == {("2023-03-26", "1679797800")}
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import re
+from datetime import datetime
+from pathlib import Path
 
-from timelapse_tool.gaps import find_gaps
-from timelapse_tool.validate import scan_folder
+from timelapse_tool.gaps import find_gaps, frozen_runs, iter_drop_frozen
+from timelapse_tool.validate import ImageValidationResult, scan_folder
 from .conftest import PATTERN, FORMAT
 
 
@@ -14,3 +16,39 @@ def test_find_gaps(sample_dataset):
     gaps = find_gaps(valid, 10)
     assert len(gaps) == 1
     assert abs(gaps[0].gap_minutes - 15) < 0.1
+
+
+def _make_img(minute: int, dhash: int) -> ImageValidationResult:
+    return ImageValidationResult(
+        path=Path(f"{minute}.jpg"),
+        timestamp=datetime(2023, 1, 1, 0, minute),
+        size_bytes=1000,
+        readable=True,
+        width=10,
+        height=10,
+        reasons=[],
+        dhash=dhash,
+    )
+
+
+def test_frozen_runs_and_drop():
+    # minutes 2-5 repeat one frame, with a single flipped bit on minute 4
+    hashes = [0x0F, 0xF0, 0xAA, 0xAA, 0xAB, 0xAA, 0x55, 0x55]
+    imgs = [_make_img(m, h) for m, h in enumerate(hashes)]
+    assert frozen_runs(hashes, 3) == [(2, 5)]
+    assert frozen_runs(hashes, 3, max_distance=0) == []
+    gaps = find_gaps(imgs, 10, frozen_frames=3)
+    assert [(g.kind, g.prev_file.name, g.next_file.name) for g in gaps] == [
+        ("frozen", "2.jpg", "5.jpg")
+    ]
+    kept = iter_drop_frozen(iter(imgs), 3)
+    assert [img.timestamp.minute for img in kept] == [0, 1, 2, 6, 7]
+
+
+def test_frozen_gap_from_scan(sample_dataset):
+    # the three valid frames of the dataset are identical
+    pattern = re.compile(PATTERN)
+    results = scan_folder(sample_dataset, pattern, FORMAT, min_bytes=0, quality=True)
+    valid = [r for r in results if r.is_valid]
+    gaps = find_gaps(valid, 10, frozen_frames=3)
+    assert sorted(g.kind for g in gaps) == ["frozen", "time"]
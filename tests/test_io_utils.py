@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from pathlib import Path
+
+from timelapse_tool.io_utils import iter_entries
+from .conftest import PATTERN, FORMAT
+
+
+def _touch(path: Path, data: bytes = b"x") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_iter_entries_walks_and_prunes_date_tree(tmp_path: Path):
+    for day in ("2023/01/01", "2023/01/02", "2023/02/01"):
+        ts = day.replace("/", "")
+        _touch(tmp_path / day / f"metroLocal_IPC_main_{ts}120000.jpg", b"abc")
+        _touch(tmp_path / day / f"metroLocal_IPC_main_{ts}000000.jpg")
+    _touch(tmp_path / "notes.txt")
+
+    flat = list(iter_entries(tmp_path))
+    assert [e.path.name for e in flat] == ["notes.txt"]
+
+    everything = list(iter_entries(tmp_path, recursive=True))
+    assert len(everything) == 7
+    assert everything[0].path.name == "notes.txt"
+    assert everything[2].path.name == "metroLocal_IPC_main_20230101120000.jpg"
+    assert everything[2].size == 3 and everything[2].mtime_ns > 0
+
+    window = list(
+        iter_entries(
+            tmp_path,
+            recursive=True,
+            pattern=re.compile(PATTERN),
+            ts_format=FORMAT,
+            start=datetime(2023, 1, 1, 6),
+            end=datetime(2023, 1, 2, 6),
+        )
+    )
+    assert [e.path.name for e in window] == [
+        "metroLocal_IPC_main_20230101120000.jpg",
+        "metroLocal_IPC_main_20230102000000.jpg",
+    ]
+
+
+def test_iter_entries_range_is_time_ordered(tmp_path: Path):
+    for name in (
+        "b_20230101030000.jpg",
+        "a_20230101020000.jpg",
+        "a_20230101010000.jpg",
+        "b_20231301000000.jpg",  # invalid month sorts inside the range
+        "c_20230101050000.jpg",
+    ):
+        _touch(tmp_path / name)
+    selected = iter_entries(
+        tmp_path,
+        pattern=re.compile(r".*_(\d{14})\.jpg"),
+        ts_format=FORMAT,
+        start=datetime(2023, 1, 1, 2),
+    )
+    assert [e.path.name for e in selected] == [
+        "a_20230101020000.jpg",
+        "b_20230101030000.jpg",
+        "c_20230101050000.jpg",
+    ]
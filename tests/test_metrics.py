@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import io
+import json
+from pathlib import Path
+
+from timelapse_tool.metrics import Metrics, MetricsDumper, Progress, to_prometheus
+
+
+def test_metrics_stages_and_prometheus():
+    metrics = Metrics()
+    with metrics.time("decode"):
+        pass
+    assert metrics.snapshot()["stages"] == {}  # disabled by default
+
+    metrics.enable()
+    metrics.add("encode", 0.5)
+    metrics.add("decode", 2.0, count=3)
+    with metrics.time("decode"):
+        pass
+    snap = metrics.snapshot()
+    assert list(snap["stages"]) == ["decode", "encode"]
+    assert snap["stages"]["decode"]["count"] == 4
+    assert snap["bottleneck"] == "decode"
+    text = to_prometheus(snap)
+    assert 'timelapse_stage_calls_total{stage="decode"} 4' in text
+    assert 'timelapse_stage_seconds_total{stage="encode"} 0.500000' in text
+
+
+def test_progress_and_dump(tmp_path: Path):
+    metrics = Metrics()
+    metrics.enable()
+    out = io.StringIO()
+    progress = Progress("check", total=4, interval=0.0, stream=out, metrics=metrics)
+    with MetricsDumper(tmp_path / "metrics.json", interval=60, metrics=metrics):
+        assert list(progress.wrap(range(4))) == [0, 1, 2, 3]
+    assert out.getvalue().endswith("\n")
+    assert "check: 4/4 (100%)" in out.getvalue()
+    assert json.loads((tmp_path / "metrics.json").read_text())["items"] == 4
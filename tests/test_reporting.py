@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import csv
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+from timelapse_tool.gaps import find_gaps
+from timelapse_tool import reporting
+from timelapse_tool.reporting import load_columns, write_gap_report, write_image_report
+from timelapse_tool.validate import iter_scan_folder
+from .conftest import PATTERN, FORMAT
+
+
+def test_image_report_formats(sample_dataset: Path, tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("reports")
+    pattern = re.compile(PATTERN)
+    for suffix in (".csv", ".json", ".jsonl", ".npz"):
+        # writers accept a generator and consume it once
+        results = iter_scan_folder(sample_dataset, pattern, FORMAT, min_bytes=0)
+        assert write_image_report(results, tmp_path / f"images{suffix}") == 5
+
+    rows = list(csv.DictReader((tmp_path / "images.csv").open()))
+    lines = (tmp_path / "images.jsonl").read_text().splitlines()
+    as_json = json.loads((tmp_path / "images.json").read_text())
+    columns = load_columns(tmp_path / "images.npz")
+    assert [r["filename"] for r in rows] == [json.loads(line)["filename"] for line in lines]
+    assert [r["filename"] for r in as_json] == list(columns["filename"])
+    assert columns["readable"].dtype == bool and columns["readable"].sum() == 3
+    assert np.isnat(columns["timestamp"]).sum() == 1  # random.txt
+
+
+def test_gap_report_empty_and_npz(sample_dataset: Path, tmp_path: Path):
+    assert write_gap_report([], tmp_path / "none.json") == 0
+    assert json.loads((tmp_path / "none.json").read_text()) == []
+
+    results = iter_scan_folder(sample_dataset, re.compile(PATTERN), FORMAT, min_bytes=0)
+    gaps = find_gaps((r for r in results if r.is_valid), 10)
+    write_gap_report(gaps, tmp_path / "gaps.npz")
+    columns = load_columns(tmp_path / "gaps.npz")
+    assert columns["gap_minutes"].tolist() == [15.0]
+    assert columns["kind"].tolist() == ["time"]
+
+
+def test_gap_csv_keeps_plain_number_format(sample_dataset: Path, tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("reports")
+    results = iter_scan_folder(sample_dataset, re.compile(PATTERN), FORMAT, min_bytes=0)
+    write_gap_report(find_gaps((r for r in results if r.is_valid), 10), tmp_path / "gaps.csv")
+    rows = list(csv.DictReader((tmp_path / "gaps.csv").open()))
+    assert rows[0]["gap_minutes"] == "15.0"
+
+
+def test_npz_report_streams_chunks(sample_dataset: Path, tmp_path: Path, monkeypatch):
+    # chunks of two rows whose file names have different widths
+    monkeypatch.setattr(reporting, "_NPZ_CHUNK", 2)
+    results = list(iter_scan_folder(sample_dataset, re.compile(PATTERN), FORMAT, min_bytes=0))
+    assert write_image_report(results, tmp_path / "images.npz") == 5
+    columns = load_columns(tmp_path / "images.npz")
+    assert columns["filename"].tolist() == [r.path.name for r in results]
+    assert columns["size_bytes"].tolist() == [r.size_bytes for r in results]
+    assert np.isnat(columns["timestamp"]).sum() == 1
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
+from itertools import count, islice
 from pathlib import Path
 
-from timelapse_tool.sampling import sample_images
+from timelapse_tool.sampling import count_sample, grid_sample, iter_sample_images, sample_images
 from timelapse_tool.validate import ImageValidationResult
 
 
@@ -24,3 +25,28 @@ def test_sample_images():
     imgs = [_make_img(start + timedelta(minutes=i)) for i in range(5)]
     sampled = sample_images(imgs, 2)
     assert len(sampled) == 3
+
+
+def test_iter_sample_images_is_lazy():
+    start = datetime(2023, 1, 1, 0, 0, 0)
+    endless = (_make_img(start + timedelta(minutes=i)) for i in count())
+    first = list(islice(iter_sample_images(endless, 5), 3))
+    assert [img.timestamp.minute for img in first] == [0, 5, 10]
+
+
+def test_grid_and_count_sampling_across_gap():
+    start = datetime(2023, 1, 1, 0, 0, 0)
+    # one frame per minute with a 10 minute outage
+    minutes = [m for m in range(30) if not 10 <= m < 20]
+    imgs = [_make_img(start + timedelta(minutes=m, seconds=10)) for m in minutes]
+
+    grid = grid_sample(imgs, 5)
+    assert [img.timestamp.minute for img in grid] == [0, 5, 9, 20, 25]
+    filled = grid_sample(imgs, 5, fill_gaps=True)
+    assert [img.timestamp.minute for img in filled] == [0, 5, 9, 9, 20, 25]
+
+    assert len(count_sample(imgs, 12, fill_gaps=True)) == 12
+    # without fill_gaps the outage is shared by the frames either side
+    nearest = [img.timestamp.minute for img in count_sample(imgs, 12)]
+    assert len(nearest) == 12 and nearest.count(9) + nearest.count(20) >= 3
+    assert len(count_sample(imgs[:3], 7)) == 7
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+
+import cv2
+
+from timelapse_tool.segments import MANIFEST_NAME, build_segmented, segment_dir
+from timelapse_tool.validate import scan_folder
+from .conftest import PATTERN, FORMAT
+
+
+def _frame_count(path: Path) -> int:
+    cap = cv2.VideoCapture(str(path))
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    return count
+
+
+def test_segmented_build_resumes(sample_dataset: Path, tmp_path_factory):
+    results = scan_folder(sample_dataset, re.compile(PATTERN), FORMAT, min_bytes=0)
+    out = tmp_path_factory.mktemp("out") / "video.avi"
+    report = build_segmented(results, out, fps=5, codec="MJPG", segment_frames=2, workers=2)
+    assert report.frames_written == 3
+    assert _frame_count(out) == 3
+
+    manifest = segment_dir(out) / MANIFEST_NAME
+    assert len(json.loads(manifest.read_text())["segments"]) == 2
+    first = segment_dir(out) / "segment_00000.avi"
+    stamp = first.stat().st_mtime_ns
+    again = build_segmented(results, out, fps=5, codec="MJPG", segment_frames=2, workers=2)
+    assert again.frames_written == 3
+    assert first.stat().st_mtime_ns == stamp
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from timelapse_tool.timeindex import timestamps_of
+from timelapse_tool.validate import ImageValidationResult
+
+
+def test_timestamps_of_whole_seconds():
+    stamps = [datetime(1969, 12, 31, 23, 59, 59), datetime(2024, 2, 29, 23, 59, 59, 500000)]
+    images = [
+        ImageValidationResult(Path(f"{i}.jpg"), ts, 1, True, 1, 1, ()) for i, ts in enumerate(stamps)
+    ]
+    ts = timestamps_of(images)
+    assert ts.dtype == np.dtype("datetime64[s]")
+    assert ts.tolist() == [datetime(1969, 12, 31, 23, 59, 59), datetime(2024, 2, 29, 23, 59, 59)]
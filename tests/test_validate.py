@@ -5,7 +5,7 @@ from pathlib import Path
 import numpy as np
 import cv2
 
-from timelapse_tool.validate import validate_image
+from timelapse_tool.validate import scan_folder, validate_image
 from .conftest import PATTERN, FORMAT
 import re
 
@@ -29,6 +29,16 @@ def test_unreadable(tmp_path: Path):
     assert "unreadable" in res.reasons
 
 
+def test_names_only_skips_reading(tmp_path: Path):
+    path = tmp_path / "metroLocal_IPC_main_20230101000000.jpg"
+    path.write_bytes(b"0" * 6000)
+    pattern = re.compile(PATTERN)
+    res = validate_image(path, pattern, FORMAT, min_bytes=5000, names_only=True)
+    assert res.is_valid and res.width is None
+    small = validate_image(path, pattern, FORMAT, min_bytes=7000, names_only=True)
+    assert "size" in small.reasons
+
+
 def test_flat_detection(tmp_path: Path):
     arr = np.zeros((10, 10, 3), dtype=np.uint8)
     path = tmp_path / "metroLocal_IPC_main_20230101000000.jpg"
@@ -36,3 +46,45 @@ def test_flat_detection(tmp_path: Path):
     pattern = re.compile(PATTERN)
     res = validate_image(path, pattern, FORMAT, min_bytes=0, flat_threshold=1.0)
     assert res.is_flat
+
+
+def test_parallel_scan_preserves_order(sample_dataset: Path):
+    pattern = re.compile(PATTERN)
+    serial = scan_folder(sample_dataset, pattern, FORMAT, min_bytes=0)
+    for executor in ("thread", "process"):
+        parallel = scan_folder(
+            sample_dataset, pattern, FORMAT, min_bytes=0, workers=3, executor=executor
+        )
+        assert [r.path for r in parallel] == [r.path for r in serial]
+        assert [r.reasons for r in parallel] == [r.reasons for r in serial]
+
+
+def test_header_only_validation(tmp_path: Path):
+    arr = np.random.default_rng(0).integers(0, 255, (40, 60, 3), dtype=np.uint8)
+    path = tmp_path / "metroLocal_IPC_main_20230101000000.jpg"
+    cv2.imwrite(str(path), arr)
+    pattern = re.compile(PATTERN)
+    res = validate_image(path, pattern, FORMAT, min_bytes=0)
+    assert res.is_valid and (res.width, res.height) == (60, 40)
+
+    data = path.read_bytes()
+    path.write_bytes(data[: len(data) // 2])
+    res = validate_image(path, pattern, FORMAT, min_bytes=0)
+    assert res.reasons == ("truncated",)
+    assert (res.width, res.height) == (60, 40)
+
+
+def test_quality_metrics(tmp_path: Path):
+    pattern = re.compile(PATTERN)
+    rng = np.random.default_rng(1)
+    sharp = tmp_path / "metroLocal_IPC_main_20230101000000.jpg"
+    cv2.imwrite(str(sharp), rng.integers(0, 255, (480, 640, 3), dtype=np.uint8))
+    dark = tmp_path / "metroLocal_IPC_main_20230101000100.jpg"
+    cv2.imwrite(str(dark), np.full((480, 640, 3), 2, dtype=np.uint8))
+
+    res = validate_image(sharp, pattern, FORMAT, min_bytes=0, quality=True)
+    assert res.is_valid and (res.width, res.height) == (640, 480)
+    assert res.brightness is not None and res.sharpness > 100 and res.dhash is not None
+
+    res = validate_image(dark, pattern, FORMAT, min_bytes=0, min_brightness=20, min_sharpness=1)
+    assert set(res.reasons) == {"dark", "blurry"}
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import random
+import re
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from timelapse_tool import video
+from timelapse_tool.validate import ImageValidationResult, scan_folder
+from .conftest import PATTERN, FORMAT
+
+
+def test_build_decodes_each_frame_once(sample_dataset: Path, monkeypatch):
+    results = scan_folder(sample_dataset, re.compile(PATTERN), FORMAT, min_bytes=0)
+    valid = [r for r in results if r.is_valid]
+    calls = []
+    imread = cv2.imread
+
+    def counting_imread(path, *args):
+        calls.append(path)
+        return imread(path, *args)
+
+    monkeypatch.setattr(video.cv2, "imread", counting_imread)
+    report = video.build_video(
+        valid, output=sample_dataset / "out.avi", fps=5, codec="MJPG", flat_threshold=1.0
+    )
+    assert report.frames_written == len(valid) == len(calls)
+    # the fixture images are plain white
+    assert report.flat == len(valid)
+
+
+def test_prefetching_build_keeps_order(monkeypatch):
+    images = [
+        ImageValidationResult(Path(str(i)), None, 1000, True, 2, 2, []) for i in range(40)
+    ]
+    written = []
+
+    class RecordingWriter:
+        def __init__(self, *args):
+            pass
+
+        def write(self, frame):
+            written.append(int(frame[0, 0, 0]))
+
+        def release(self):
+            pass
+
+    def slow_load(img, size):
+        # finish out of order to exercise the reordering queue
+        time.sleep(random.random() / 1000)
+        return np.full((2, 2, 3), int(img.path.name), dtype=np.uint8)
+
+    monkeypatch.setattr(video.cv2, "VideoWriter", RecordingWriter)
+    monkeypatch.setattr(video, "_load_frame", slow_load)
+    report = video.build_video(
+        images, output=Path("out.avi"), fps=5, codec="MJPG", decode_workers=4, queue_depth=8
+    )
+    assert report.frames_written == 40
+    assert written == list(range(40))
+
+
+def test_multi_output_build_decodes_once(sample_dataset: Path, monkeypatch):
+    results = scan_folder(sample_dataset, re.compile(PATTERN), FORMAT, min_bytes=0)
+    valid = [r for r in results if r.is_valid]
+    calls = []
+    imread, resize = cv2.imread, cv2.resize
+    resized = []
+
+    def counting_imread(path, *args):
+        calls.append(path)
+        return imread(path, *args)
+
+    def recording_resize(frame, size, **kwargs):
+        resized.append(((frame.shape[1], frame.shape[0]), size))
+        return resize(frame, size, **kwargs)
+
+    monkeypatch.setattr(video.cv2, "imread", counting_imread)
+    monkeypatch.setattr(video.cv2, "resize", recording_resize)
+    outputs = [
+        video.OutputSpec(sample_dataset / "thumb.avi", (20, 20), "MJPG", 5),
+        video.OutputSpec(sample_dataset / "full.avi", None, "MJPG", 5),
+        video.OutputSpec(sample_dataset / "preview.avi", (50, 50), "MJPG", 10),
+    ]
+    reports = video.build_videos(valid, outputs)
+    assert len(calls) == len(valid)
+    assert [r.frames_written for r in reports] == [len(valid)] * 3
+    # each smaller output is derived from the next larger one
+    assert resized == [((100, 100), (50, 50)), ((50, 50), (20, 20))] * len(valid)
+    assert all(o.path.stat().st_size > 0 for o in outputs)
+
+
+def test_mixed_aspect_outputs_are_never_upscaled(sample_dataset: Path, monkeypatch):
+    results = scan_folder(sample_dataset, re.compile(PATTERN), FORMAT, min_bytes=0)
+    valid = [r for r in results if r.is_valid]
+    resize = cv2.resize
+    resized = []
+
+    def recording_resize(frame, size, **kwargs):
+        resized.append(((frame.shape[1], frame.shape[0]), size))
+        return resize(frame, size, **kwargs)
+
+    monkeypatch.setattr(video.cv2, "resize", recording_resize)
+    outputs = [
+        video.OutputSpec(sample_dataset / "wide.avi", (100, 20), "MJPG", 5),
+        video.OutputSpec(sample_dataset / "square.avi", (50, 50), "MJPG", 5),
+    ]
+    video.build_videos(valid, outputs)
+    # decoded at the union of both sizes; the wide output is not derived
+    # from the narrower square one
+    assert resized == [
+        ((100, 100), (100, 50)), ((100, 50), (50, 50)), ((100, 50), (100, 20))
+    ] * len(valid)
+
+
+def test_reduced_read_flag():
+    assert video.reduced_read_flag((3840, 2160), (1280, 720)) == cv2.IMREAD_REDUCED_COLOR_2
+    assert video.reduced_read_flag((3840, 2160), (480, 270)) == cv2.IMREAD_REDUCED_COLOR_8
+    assert video.reduced_read_flag((1920, 1080), (1920, 1080)) == cv2.IMREAD_COLOR
+    assert video.reduced_read_flag((None, None), (640, 360)) == cv2.IMREAD_COLOR
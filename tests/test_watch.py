@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from timelapse_tool.gaps import find_gaps
+from timelapse_tool.validate import ImageValidationResult
+from timelapse_tool.watch import GapTracker, InotifyWatcher, PollingWatcher
+
+
+def _make_img(ts: datetime) -> ImageValidationResult:
+    return ImageValidationResult(
+        path=Path(f"{ts:%H%M}.jpg"),
+        timestamp=ts,
+        size_bytes=1000,
+        readable=True,
+        width=10,
+        height=10,
+        reasons=[],
+    )
+
+
+def test_gap_tracker_matches_find_gaps():
+    start = datetime(2023, 1, 1)
+    minutes = [0, 5, 20, 22, 40, 41]
+    imgs = [_make_img(start + timedelta(minutes=m)) for m in minutes]
+    tracker = GapTracker(gap_minutes=10)
+    incremental = [g for g in map(tracker.add, imgs) if g is not None]
+    assert incremental == find_gaps(imgs, 10)
+
+    assert tracker.check_open(start + timedelta(minutes=45)) is None
+    assert tracker.check_open(start + timedelta(minutes=52)) == pytest.approx(11)
+    # only alerted once per open gap
+    assert tracker.check_open(start + timedelta(minutes=60)) is None
+
+
+def test_polling_watcher_waits_for_stable_files(tmp_path: Path):
+    (tmp_path / "old.jpg").write_bytes(b"x")
+    watcher = PollingWatcher(tmp_path)
+    (tmp_path / "new.jpg").write_bytes(b"x")
+    assert watcher.poll(0) == []
+    assert watcher.poll(0) == [tmp_path / "new.jpg"]
+    assert watcher.poll(0) == []
+
+
+def test_inotify_watcher_reports_closed_files(tmp_path: Path):
+    try:
+        watcher = InotifyWatcher(tmp_path)
+    except OSError:
+        pytest.skip("inotify not available")
+    try:
+        (tmp_path / "a.jpg").write_bytes(b"x")
+        assert watcher.poll(1.0) == [tmp_path / "a.jpg"]
+    finally:
+        watcher.close()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+"""Run the commands of many cameras on one shared worker pool."""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+import argparse
+import json
+import logging
+import time
+
+from .validate import resolve_workers
+
+BATCH_COMMANDS = ("check", "report-gaps", "build")
+# options that belong before the sub-command on the command line
+_GLOBAL_OPTIONS = ("image_folder", "pattern", "timestamp_format", "report_out")
+# top-level options that configure the whole process; they are given once on
+# the batch command line and rejected in job files
+_RUN_OPTIONS = ("log_level", "progress", "metrics_out", "metrics_interval", "profile")
+# worker options every job takes from the shared pool of ``batch --workers``
+_POOL_OPTIONS = ("workers", "executor", "decode_workers")
+
+
+@dataclass
+class Job:
+    """One camera: a command and its options, named as on the command line."""
+
+    name: str
+    command: str
+    options: Dict[str, object] = field(default_factory=dict)
+
+
+@dataclass
+class JobResult:
+    name: str
+    command: str
+    exit_code: int
+    seconds: float
+    error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.error is not None:
+            return "error"
+        return "fail" if self.exit_code else "ok"
+
+
+def load_jobs(path: Path) -> List[Job]:
+    """Read a JSON jobs file.
+
+    The file holds ``{"defaults": {...}, "jobs": [{...}, ...]}`` (or just
+    the list of jobs).  Each job has a ``command``, an optional ``name`` and
+    option values keyed by the long option name, with dashes or
+    underscores, e.g. ``{"command": "build", "image_folder": "D:/cam1",
+    "output_video": "cam1.mp4", "sample_minutes": 5}``.  A list value
+    repeats its option, as for ``"output": ["a.mp4", "b.mp4,size=640x360"]``.
+    ``defaults`` are merged into every job.
+
+    Logging, progress, metrics and profiling options apply to the whole
+    process and are only accepted before ``batch`` on the command line.
+    Worker options are rejected too: all jobs share the pool sized by
+    ``batch --workers``.
+    """
+    data = json.loads(path.read_text())
+    if isinstance(data, list):
+        data = {"jobs": data}
+    defaults = data.get("defaults", {})
+    jobs = []
+    for i, entry in enumerate(data["jobs"]):
+        options = {**defaults, **entry}
+        command = options.pop("command", None)
+        if command not in BATCH_COMMANDS:
+            raise ValueError(f"job {i}: command must be one of {BATCH_COMMANDS}")
+        name = str(options.pop("name", f"job{i}"))
+        options = {k.replace("-", "_"): v for k, v in options.items()}
+        for key in _RUN_OPTIONS:
+            if key in options:
+                raise ValueError(
+                    f"job {i}: {key} applies to the whole batch; pass it before 'batch'"
+                )
+        for key in _POOL_OPTIONS:
+            if key in options:
+                raise ValueError(
+                    f"job {i}: {key} is set by the shared pool; use 'batch --workers'"
+                )
+        jobs.append(Job(name, command, options))
+    return jobs
+
+
+def _flags(options: Dict[str, object]) -> List[str]:
+    argv: List[str] = []
+    for key, value in options.items():
+        if value is None or value is False:
+            continue
+        flag = "--" + key.replace("_", "-")
+        if isinstance(value, list):
+            for item in value:
+                argv += [flag, str(item)]
+        elif value is True:
+            argv.append(flag)
+        else:
+            argv += [flag, str(value)]
+    return argv
+
+
+def job_argv(job: Job) -> List[str]:
+    """Return the command line equivalent to *job*."""
+    top = {k: v for k, v in job.options.items() if k in _GLOBAL_OPTIONS}
+    rest = {k: v for k, v in job.options.items() if k not in _GLOBAL_OPTIONS}
+    return [*_flags(top), job.command, *_flags(rest)]
+
+
+def run_batch(
+    jobs: Sequence[Job],
+    parse: Callable[[List[str]], argparse.Namespace],
+    workers: Optional[int] = 0,
+    max_jobs: Optional[int] = None,
+) -> List[JobResult]:
+    """Run *jobs* with all validation and decode work on one thread pool.
+
+    *parse* turns a job's command line into the namespace its command
+    function expects.  Up to ``max_jobs`` jobs (default: all) are driven
+    concurrently, each from its own lightweight thread, while the CPU work
+    goes to a single pool of ``workers`` threads (``0`` = one per core).
+    Every job keeps only a bounded window of tasks in that pool's queue, so
+    jobs are served in turn and a large camera cannot starve the others.
+    """
+    n = resolve_workers(workers)
+    results: List[Optional[JobResult]] = [None] * len(jobs)
+
+    def run(index: int, job: Job, pool: ThreadPoolExecutor) -> None:
+        start = time.perf_counter()
+        code, error = 1, None
+        try:
+            args = parse(job_argv(job))
+            if args.image_folder is None:
+                raise ValueError("image_folder is required")
+            args.workers = n
+            args.executor = "thread"
+            args.shared_pool = pool
+            if job.command == "build":
+                args.decode_workers = n
+            code = args.func(args)
+        except SystemExit as exc:
+            # argparse reports bad options this way
+            error = f"invalid options (exit {exc.code})"
+        except Exception as exc:
+            logging.exception("job %s failed", job.name)
+            error = f"{type(exc).__name__}: {exc}"
+        result = JobResult(job.name, job.command, code, time.perf_counter() - start, error)
+        logging.info("job %s: %s in %.1fs", job.name, result.status, result.seconds)
+        results[index] = result
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        with ThreadPoolExecutor(max_workers=max_jobs or max(1, len(jobs))) as drivers:
+            for i, job in enumerate(jobs):
+                drivers.submit(run, i, job, pool)
+    return [r for r in results if r is not None]
+
+
+def write_batch_summary(results: Sequence[JobResult], path: Path) -> None:
+    """Write the per-job outcome of a batch to ``path`` as JSON."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = [{**asdict(r), "status": r.status} for r in results]
+    path.write_text(json.dumps(data, indent=2))
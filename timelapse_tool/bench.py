@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+"""Synthetic datasets and per-stage throughput measurements."""
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from .gaps import find_gaps
+from .sampling import sample_images
+from .validate import ImageValidationResult
+from .video import build_video
+
+try:  # not available on Windows
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+# bumped when the layout of the JSON result changes
+BENCH_VERSION = 1
+DEFAULT_PREFIX = "metroLocal_IPC_main_"
+# distinct synthetic frames encoded once and cycled through
+_VARIANTS = 8
+
+
+@dataclass
+class DatasetSpec:
+    """Shape of a generated camera folder."""
+
+    frames: int
+    width: int = 640
+    height: int = 360
+    interval_seconds: int = 60
+    gap_rate: float = 0.0
+    corrupt_rate: float = 0.0
+    seed: int = 0
+    start: datetime = datetime(2023, 1, 1)
+
+
+@dataclass
+class DatasetStats:
+    written: int = 0
+    corrupt: int = 0
+    gaps: int = 0
+    bytes: int = 0
+
+
+def _variants(width: int, height: int, rng: np.random.Generator) -> List[bytes]:
+    """Encode a few textured frames so that decoding costs are realistic."""
+    y, x = np.mgrid[0:height, 0:width]
+    encoded = []
+    for i in range(_VARIANTS):
+        base = (x * (i + 1) + y * (_VARIANTS - i)) % 256
+        noise = rng.integers(0, 32, size=(height, width))
+        gray = (base + noise).astype(np.uint8)
+        frame = cv2.merge([gray, np.roll(gray, i, axis=1), np.roll(gray, i, axis=0)])
+        ok, buf = cv2.imencode(".jpg", frame)
+        if not ok:
+            raise RuntimeError("cannot encode synthetic frame")
+        encoded.append(buf.tobytes())
+    return encoded
+
+
+def generate_dataset(
+    folder: Path, spec: DatasetSpec, prefix: str = DEFAULT_PREFIX
+) -> DatasetStats:
+    """Write a synthetic camera folder described by *spec* to *folder*.
+
+    Frames are named ``<prefix><YYYYmmddHHMMSS>.jpg`` every
+    ``interval_seconds``.  Each slot starts an outage of 10 to 60 missing
+    frames with probability ``gap_rate`` and each written frame is
+    truncated with probability ``corrupt_rate``.  The output only depends
+    on *spec*, so runs are comparable.
+    """
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(spec.seed)
+    variants = _variants(spec.width, spec.height, np.random.default_rng(spec.seed))
+    stats = DatasetStats()
+    step = timedelta(seconds=spec.interval_seconds)
+    slot = 0
+    while stats.written < spec.frames:
+        if rng.random() < spec.gap_rate:
+            slot += rng.randint(10, 60)
+            stats.gaps += 1
+        ts = spec.start + slot * step
+        data = variants[slot % _VARIANTS]
+        if rng.random() < spec.corrupt_rate:
+            data = data[: len(data) // 2]
+            stats.corrupt += 1
+        (folder / f"{prefix}{ts:%Y%m%d%H%M%S}.jpg").write_bytes(data)
+        stats.written += 1
+        stats.bytes += len(data)
+        slot += 1
+    return stats
+
+
+@dataclass
+class StageResult:
+    seconds: float
+    items: int
+    per_second: float
+
+
+@dataclass
+class BenchResult:
+    stages: Dict[str, StageResult] = field(default_factory=dict)
+    peak_rss_mb: Optional[float] = None
+    children_peak_rss_mb: Optional[float] = None
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(s.seconds for s in self.stages.values())
+
+    def to_dict(self, **extra: object) -> Dict[str, object]:
+        return {
+            "version": BENCH_VERSION,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            **extra,
+            "stages": {name: asdict(s) for name, s in self.stages.items()},
+            "total_seconds": self.total_seconds,
+            "peak_rss_mb": self.peak_rss_mb,
+            "children_peak_rss_mb": self.children_peak_rss_mb,
+        }
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Return the peak resident set size in MiB, if the platform reports it."""
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+@contextmanager
+def _stage(result: BenchResult, name: str) -> Iterator[Callable[[int], None]]:
+    items = [0]
+
+    def count(n: int) -> None:
+        items[0] = n
+
+    start = time.perf_counter()
+    yield count
+    seconds = time.perf_counter() - start
+    result.stages[name] = StageResult(
+        seconds=seconds, items=items[0], per_second=items[0] / seconds if seconds else 0.0
+    )
+
+
+def run_bench(
+    scan: Callable[[], List[ImageValidationResult]],
+    gap_minutes: int = 10,
+    sample_minutes: Optional[int] = None,
+    build: bool = True,
+    fps: int = 30,
+    codec: str = "mp4v",
+    size: Optional[Tuple[int, int]] = None,
+    decode_workers: int = 0,
+) -> BenchResult:
+    """Time the scan, gap, sampling and build stages on one dataset.
+
+    *scan* returns the validation results, so the caller decides how the
+    folder is scanned.  The video is written to a temporary folder and
+    discarded.
+    """
+    result = BenchResult()
+    with _stage(result, "scan") as done:
+        results = scan()
+        done(len(results))
+    valid = [r for r in results if r.is_valid]
+    with _stage(result, "gaps") as done:
+        find_gaps(valid, gap_minutes)
+        done(len(valid))
+    with _stage(result, "sample") as done:
+        sampled = sample_images(valid, sample_minutes)
+        done(len(valid))
+    if build and sampled:
+        with tempfile.TemporaryDirectory() as tmp:
+            with _stage(result, "build") as done:
+                report = build_video(
+                    sampled,
+                    Path(tmp) / "bench.mp4",
+                    fps,
+                    codec,
+                    size=size,
+                    decode_workers=decode_workers,
+                )
+                done(report.frames_written)
+    result.peak_rss_mb = peak_rss_mb()
+    result.children_peak_rss_mb = peak_rss_mb(children=True)
+    return result
+
+
+def compare(
+    current: Dict[str, object], baseline: Dict[str, object], max_slowdown: float
+) -> List[str]:
+    """Return the stages of *current* more than ``max_slowdown`` times slower.
+
+    Stages are compared on ``per_second`` so datasets of different sizes can
+    be compared; stages missing from either run are ignored.
+    """
+    slower = []
+    base_stages = baseline.get("stages", {})
+    for name, stage in current.get("stages", {}).items():  # type: ignore[union-attr]
+        base = base_stages.get(name)  # type: ignore[union-attr]
+        if not base or not base["per_second"] or not stage["per_second"]:
+            continue
+        if base["per_second"] / stage["per_second"] > max_slowdown:
+            slower.append(name)
+    return slower
+
+
+def load_result(path: Path) -> Dict[str, object]:
+    return json.loads(path.read_text())
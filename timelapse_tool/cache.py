@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+"""Persistent cache of validation results."""
+
+from dataclasses import fields
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Pattern, Tuple
+import json
+import os
+import sqlite3
+
+from .io_utils import TOOL_PREFIX, FileEntry
+from .validate import ImageValidationResult
+
+DEFAULT_CACHE_NAME = TOOL_PREFIX + "cache.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    name TEXT NOT NULL,
+    params TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (name, params)
+)
+"""
+
+
+def cache_params(
+    pattern: Pattern[str],
+    ts_format: str,
+    min_bytes: int,
+    flat_threshold: Optional[float],
+    deep: bool,
+    *quality_options: object,
+) -> str:
+    """Return the key describing the validation settings of a scan."""
+    return json.dumps(
+        [pattern.pattern, ts_format, min_bytes, flat_threshold, deep, *quality_options]
+    )
+
+
+def _encode(result: ImageValidationResult) -> str:
+    data = {f.name: getattr(result, f.name) for f in fields(result) if f.name != "path"}
+    if result.timestamp is not None:
+        data["timestamp"] = result.timestamp.isoformat()
+    return json.dumps(data)
+
+
+def _decode(path: Path, text: str) -> ImageValidationResult:
+    data = json.loads(text)
+    if data["timestamp"] is not None:
+        data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+    return ImageValidationResult(path=path, **data)
+
+
+class ValidationCache:
+    """SQLite store of :class:`ImageValidationResult` keyed on file identity.
+
+    An entry is reused only when the file path, ``st_size`` and
+    ``st_mtime_ns`` match and it was produced with the same validation
+    parameters.  Paths are stored relative to *root*, the scanned folder
+    (by default the folder holding the database), so same-named files in
+    different ``YYYY/MM/DD`` sub-folders do not collide.  Entries for all
+    files of one parameter set are loaded in a single query so lookups do
+    not touch the database.
+    """
+
+    def __init__(self, path: Path, params: str, root: Optional[Path] = None) -> None:
+        self.path = path
+        self.params = params
+        self._prefix = str(path.parent if root is None else root) + os.sep
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute(_SCHEMA)
+        rows = self._conn.execute(
+            "SELECT name, size, mtime_ns, data FROM results WHERE params = ?", (params,)
+        )
+        self._entries: Dict[str, Tuple[int, int, str]] = {
+            name: (size, mtime_ns, data) for name, size, mtime_ns, data in rows
+        }
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self) -> "ValidationCache":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _key(self, path: Path) -> str:
+        # listed paths are joined onto the scanned folder, so a prefix check
+        # is enough and much cheaper than Path.relative_to
+        text = str(path)
+        if text.startswith(self._prefix):
+            return text[len(self._prefix):].replace(os.sep, "/")
+        return text
+
+    def get(self, file: FileEntry) -> Optional[ImageValidationResult]:
+        """Return the cached result for *file* if its stat still matches."""
+        entry = self._entries.get(self._key(file.path))
+        if entry is None or entry[0] != file.size or entry[1] != file.mtime_ns:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _decode(file.path, entry[2])
+
+    def put_many(self, items: Iterable[Tuple[ImageValidationResult, FileEntry]]) -> None:
+        """Store freshly validated results along with the listing they match."""
+        rows = []
+        for result, file in items:
+            data = _encode(result)
+            key = self._key(file.path)
+            self._entries[key] = (file.size, file.mtime_ns, data)
+            rows.append((key, self.params, file.size, file.mtime_ns, data))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows
+            )
@@ -2,18 +2,48 @@ from __future__ import annotations
 
 """Command line interface for the timelapse tool."""
 
-from dataclasses import dataclass
-from typing import List, Optional
+from collections import deque
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
 import argparse
+import cProfile
+import io
+import json
 import logging
+import pstats
 import re
+import time
 from pathlib import Path
 
-from .gaps import find_gaps
-from .reporting import write_gap_report, write_image_report
-from .sampling import sample_images
-from .validate import ImageValidationResult, scan_folder
-from .video import build_video
+from .batch import load_jobs, run_batch, write_batch_summary
+from .cache import DEFAULT_CACHE_NAME, ValidationCache, cache_params
+from .defaults import (
+    DEFAULT_DEFLICKER_WINDOW,
+    DEFAULT_FRAME_CACHE_MB,
+    DEFAULT_FRAME_CACHE_NAME,
+    DEFAULT_MAX_GAIN,
+    FROZEN_DISTANCE,
+    SAMPLE_MODES,
+)
+from .gaps import Gap, find_gaps, iter_drop_frozen
+from .io_utils import count_entries
+from .metrics import METRICS, MetricsDumper, Progress
+from .reporting import write_exit_report, write_gap_report, write_image_report
+from .validate import (
+    EXECUTORS,
+    ImageValidationResult,
+    iter_scan_folder,
+    resolve_workers,
+    validate_image,
+)
+
+# OpenCV and NumPy are only imported by the commands that need them, so
+# that check, report-gaps and --help start without loading either
+if TYPE_CHECKING:
+    from .video import OutputSpec
 
 DEFAULT_PATTERN = r"metroLocal_IPC_main_(\d{14})\.jpg"
 DEFAULT_TS_FORMAT = "%Y%m%d%H%M%S"
@@ -32,143 +62,755 @@ def _setup_logging(level: str) -> None:
     logging.basicConfig(level=getattr(logging, level.upper()), format="%(levelname)s:%(message)s")
 
 
-def _scan(args: argparse.Namespace) -> List[ImageValidationResult]:
+def _iter_scan(
+    args: argparse.Namespace, header_only: bool = False
+) -> Iterator[ImageValidationResult]:
+    """Scan ``args.image_folder``.
+
+    ``header_only`` skips the full decode and flat-frame statistics; only
+    the brightness and sharpness filters, the hashes needed to drop frozen
+    frames and the brightness used to deflicker still need a (reduced)
+    decode.
+    """
     pattern = re.compile(args.pattern)
-    return scan_folder(
+    names_only = getattr(args, "no_decode", False)
+    flat_threshold = None if header_only else args.flat_frame_threshold
+    deep = False if header_only else args.deep
+    if header_only:
+        quality = getattr(args, "drop_frozen", False) or getattr(args, "deflicker", False)
+    else:
+        quality = args.quality or bool(getattr(args, "frozen_frames", None))
+    cache = None
+    if args.cache is not None:
+        cache_path = Path(args.cache) if args.cache else args.image_folder / DEFAULT_CACHE_NAME
+        params = cache_params(
+            pattern,
+            args.timestamp_format,
+            args.min_bytes,
+            flat_threshold,
+            deep,
+            quality,
+            args.min_brightness,
+            args.min_sharpness,
+            names_only,
+        )
+        cache = ValidationCache(cache_path, params, root=args.image_folder)
+    results = iter_scan_folder(
         folder=args.image_folder,
         pattern=pattern,
         ts_format=args.timestamp_format,
         min_bytes=args.min_bytes,
-        flat_threshold=args.flat_frame_threshold,
+        flat_threshold=flat_threshold,
+        deep=deep,
+        workers=args.workers,
+        executor=args.executor,
+        cache=cache,
+        recursive=args.recursive,
+        start=args.start,
+        end=args.end,
+        quality=quality,
+        min_brightness=args.min_brightness,
+        min_sharpness=args.min_sharpness,
+        pool=getattr(args, "shared_pool", None),
+        names_only=names_only,
     )
+    if args.progress:
+        # a name-only listing, so the ETA costs no stat or decode
+        total = count_entries(
+            args.image_folder,
+            args.recursive,
+            pattern,
+            args.timestamp_format,
+            args.start,
+            args.end,
+        )
+        results = Progress(args.command, total).wrap(results)
+    elif METRICS.enabled:
+        results = _ticked(results)
+    try:
+        yield from results
+    finally:
+        if cache is not None:
+            cache.close()
+            logging.debug("cache: %s hits, %s misses", cache.hits, cache.misses)
+
+
+def _ticked(results: Iterable[ImageValidationResult]) -> Iterator[ImageValidationResult]:
+    for r in results:
+        METRICS.tick()
+        yield r
 
 
-def _summary(results: List[ImageValidationResult]) -> Summary:
-    matched = sum(1 for r in results if "pattern" not in r.reasons)
-    valid = sum(r.is_valid for r in results)
-    flat = sum(1 for r in results if r.is_flat)
-    return Summary(
-        total=len(results),
-        matched=matched,
-        valid=valid,
-        invalid=len(results) - valid,
-        flat=flat,
+def _scan(args: argparse.Namespace) -> List[ImageValidationResult]:
+    start = time.perf_counter()
+    results = list(_iter_scan(args))
+    logging.debug(
+        "validated %s files in %.2fs (%s workers, %s executor)",
+        len(results),
+        time.perf_counter() - start,
+        resolve_workers(args.workers),
+        args.executor,
     )
+    return results
 
 
-def cmd_check(args: argparse.Namespace) -> int:
-    results = _scan(args)
+def _tally(summary: Summary, r: ImageValidationResult) -> None:
+    summary.total += 1
+    summary.matched += "pattern" not in r.reasons
+    summary.valid += r.is_valid
+    summary.invalid += not r.is_valid
+    summary.flat += r.is_flat
+
+
+def _check(args: argparse.Namespace, results: Iterable[ImageValidationResult]) -> Summary:
+    """Summarise *results*, streaming them to ``--report-out`` as they come."""
+    summary = Summary(total=0, matched=0, valid=0, invalid=0, flat=0)
+
+    def counted() -> Iterator[ImageValidationResult]:
+        for r in results:
+            _tally(summary, r)
+            yield r
+
     if args.report_out:
-        write_image_report(results, args.report_out)
-    summary = _summary(results)
+        write_image_report(counted(), args.report_out)
+    else:
+        deque(counted(), maxlen=0)
     logging.info(
         "scanned %s files: %s valid, %s invalid", summary.total, summary.valid, summary.invalid
     )
     if summary.flat:
         logging.info("%s suspected flat frames", summary.flat)
-    return 0
+    return summary
 
 
-def cmd_report_gaps(args: argparse.Namespace) -> int:
-    results = _scan(args)
-    valid = [r for r in results if r.is_valid]
-    gaps = find_gaps(valid, args.gap_minutes)
+def _format_gap(g: Gap) -> str:
+    line = f"{g.prev_file.name}, {g.prev_ts}, {g.next_file.name}, {g.next_ts}, {g.gap_minutes:.1f}"
+    return line if g.kind == "time" else f"{line}, {g.kind}"
+
+
+def _report_gaps(
+    args: argparse.Namespace, results: Iterable[ImageValidationResult], report_out: Optional[Path]
+) -> List[Gap]:
+    valid = (r for r in results if r.is_valid)
+    gaps = find_gaps(valid, args.gap_minutes, args.frozen_frames, args.frozen_distance)
     for g in gaps:
-        print(
-            f"{g.prev_file.name}, {g.prev_ts}, {g.next_file.name}, {g.next_ts}, {g.gap_minutes:.1f}"
-        )
-    if args.report_out:
-        write_gap_report(gaps, args.report_out)
+        print(_format_gap(g))
+    if report_out:
+        write_gap_report(gaps, report_out)
     logging.info("%s gaps found", len(gaps))
+    return gaps
+
+
+def cmd_check(args: argparse.Namespace) -> int:
+    # results are written as they are validated and never held in memory
+    _check(args, _iter_scan(args))
     return 0
 
 
+def cmd_report_gaps(args: argparse.Namespace) -> int:
+    if args.no_decode:
+        decoding = [
+            flag
+            for flag, value in (
+                ("--deep", args.deep),
+                ("--quality", args.quality),
+                ("--frozen-frames", args.frozen_frames),
+                ("--flat-frame-threshold", args.flat_frame_threshold),
+                ("--min-brightness", args.min_brightness),
+                ("--min-sharpness", args.min_sharpness),
+            )
+            if value
+        ]
+        if decoding:
+            raise SystemExit(f"--no-decode cannot be combined with {', '.join(decoding)}")
+    _report_gaps(args, _iter_scan(args), args.report_out)
+    return 0
+
+
+def _worker_count(text: str) -> int:
+    """Parse a worker count; ``0`` means one per core."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid worker count {text!r}") from None
+    if value < 0:
+        raise argparse.ArgumentTypeError("worker count must be >= 0")
+    return value
+
+
+def _frame_size(text: str) -> Tuple[int, int]:
+    w, sep, h = text.lower().partition("x")
+    if not (sep and w.isdigit() and h.isdigit() and int(w) and int(h)):
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}, expected WxH")
+    return (int(w), int(h))
+
+
+def _output_spec(text: str) -> Dict[str, object]:
+    """Parse ``PATH[,size=WxH][,codec=CODEC][,fps=N]`` for ``--output``."""
+    path, *options = text.split(",")
+    spec: Dict[str, object] = {"path": Path(path)}
+    for option in options:
+        key, sep, value = option.partition("=")
+        if not sep or key not in ("size", "codec", "fps"):
+            raise argparse.ArgumentTypeError(f"bad output option {option!r}")
+        if key == "size":
+            spec[key] = _frame_size(value)
+        elif key == "fps":
+            if not value.isdigit() or not int(value):
+                raise argparse.ArgumentTypeError(f"invalid fps {value!r}")
+            spec[key] = int(value)
+        else:
+            spec[key] = value
+    return spec
+
+
+def _outputs(args: argparse.Namespace) -> List[OutputSpec]:
+    """Return ``--output-video`` and every ``--output``, defaults from the build."""
+    from .video import OutputSpec
+
+    outputs = []
+    if args.output_video:
+        outputs.append(OutputSpec(args.output_video, args.resize, args.codec, args.fps))
+    for spec in args.output or []:
+        outputs.append(
+            OutputSpec(
+                spec["path"],
+                spec.get("size") or args.resize,
+                spec.get("codec", args.codec),
+                spec.get("fps", args.fps),
+            )
+        )
+    if not outputs:
+        raise SystemExit("build needs --output-video or --output")
+    return outputs
+
+
+def _sample(
+    args: argparse.Namespace, valid: Iterable[ImageValidationResult]
+) -> Iterable[ImageValidationResult]:
+    from .sampling import count_sample, grid_sample, iter_sample_images
+
+    if args.sample_mode == "grid":
+        if not args.sample_minutes:
+            raise SystemExit("--sample-mode grid requires --sample-minutes")
+        return grid_sample(valid, args.sample_minutes, fill_gaps=args.fill_gaps)
+    if args.sample_mode == "count":
+        count = args.sample_count
+        if args.target_seconds:
+            count = round(args.target_seconds * args.fps)
+        if not count:
+            raise SystemExit("--sample-mode count requires --sample-count or --target-seconds")
+        return count_sample(valid, count, fill_gaps=args.fill_gaps)
+    # the default interval mode keeps the build fully streaming
+    return iter_sample_images(valid, args.sample_minutes)
+
+
 def cmd_build(args: argparse.Namespace) -> int:
-    results = _scan(args)
-    valid = [r for r in results if r.is_valid]
-    sampled = sample_images(valid, args.sample_minutes)
+    # listing, validation, sampling and encoding are chained generators; the
+    # scan only reads headers so each frame is decoded once, by the encoder
+    if args.deep:
+        raise SystemExit("build decodes every frame once while encoding; drop --deep")
+    if args.quality:
+        raise SystemExit(
+            "build records quality only for --drop-frozen or --deflicker; drop --quality"
+        )
+    if args.frozen_frames and not args.drop_frozen:
+        raise SystemExit("--frozen-frames has no effect on build without --drop-frozen")
+    valid: Iterable[ImageValidationResult] = (
+        r for r in _iter_scan(args, header_only=True) if r.is_valid
+    )
+    if args.drop_frozen:
+        if not args.frozen_frames:
+            raise SystemExit("--drop-frozen requires --frozen-frames")
+        valid = iter_drop_frozen(valid, args.frozen_frames, args.frozen_distance)
+    sampled = _sample(args, valid)
+    outputs = _outputs(args)
     if args.dry_run:
-        logging.info("dry-run: %s frames would be written", len(sampled))
+        logging.info("dry-run: %s frames would be written", sum(1 for _ in sampled))
         return 0
-    size = None
-    if args.resize:
-        w, h = map(int, args.resize.lower().split("x"))
-        size = (w, h)
-    report = build_video(
-        sampled,
-        output=args.output_video,
-        fps=args.fps,
-        codec=args.codec,
-        size=size,
-        strict=args.strict,
-        dry_run=False,
-    )
+    if args.segment_frames:
+        from .segments import build_segmented
+
+        if args.frame_cache is not None:
+            raise SystemExit("--frame-cache cannot be combined with --segment-frames")
+        if args.deflicker:
+            raise SystemExit("--deflicker cannot be combined with --segment-frames")
+        if len(outputs) > 1:
+            raise SystemExit("--segment-frames builds a single output")
+        out = outputs[0]
+        reports = [
+            build_segmented(
+                sampled,
+                output=out.path,
+                fps=out.fps,
+                codec=out.codec,
+                segment_frames=args.segment_frames,
+                size=out.size,
+                strict=args.strict,
+                workers=args.segment_workers,
+                flat_threshold=args.flat_frame_threshold,
+            )
+        ]
+    else:
+        from .framecache import FrameCache
+        from .video import build_videos
+
+        frame_cache = None
+        if args.frame_cache is not None:
+            root = (
+                Path(args.frame_cache)
+                if args.frame_cache
+                else args.image_folder / DEFAULT_FRAME_CACHE_NAME
+            )
+            frame_cache = FrameCache(root, args.frame_cache_mb << 20)
+        try:
+            reports = build_videos(
+                sampled,
+                outputs,
+                strict=args.strict,
+                flat_threshold=args.flat_frame_threshold,
+                decode_workers=args.decode_workers,
+                queue_depth=args.queue_depth,
+                decode_pool=getattr(args, "shared_pool", None),
+                frame_cache=frame_cache,
+                deflicker_window=args.deflicker_window if args.deflicker else None,
+                max_gain=args.deflicker_max_gain,
+            )
+        finally:
+            if frame_cache is not None:
+                frame_cache.close()
+                logging.debug(
+                    "frame cache: %s hits, %s misses", frame_cache.hits, frame_cache.misses
+                )
+    for out, report in zip(outputs, reports):
+        logging.info(
+            "wrote %s frames to %s (%s skipped)", report.frames_written, out.path, report.skipped
+        )
+    report = reports[0]
+    if report.flat:
+        logging.info("%s suspected flat frames", report.flat)
+    # decoding is shared by all outputs, encoding is paid once per output
+    encode_seconds = sum(r.encode_seconds for r in reports)
     logging.info(
-        "wrote %s frames to %s (%s skipped)", report.frames_written, args.output_video, report.skipped
+        "%s-bound: waited %.2fs for decoded frames (%s stalls), encoded for %.2fs",
+        "decode" if report.decode_wait_seconds > encode_seconds else "encode",
+        report.decode_wait_seconds,
+        report.stalls,
+        encode_seconds,
     )
     return 0
 
 
 def cmd_test_dataset(args: argparse.Namespace) -> int:
-    # run check
-    check_code = cmd_check(args)
-    # run gaps
-    gaps_args = argparse.Namespace(**vars(args))
-    gaps_args.gap_minutes = args.gap_minutes
-    gaps_code = cmd_report_gaps(gaps_args)
-    # simple failure policy: fail if any invalid or gaps
+    # scan once and feed the same results to every stage
     results = _scan(args)
-    summary = _summary(results)
-    gaps = find_gaps([r for r in results if r.is_valid], args.gap_minutes)
-    if summary.invalid or gaps:
-        return 1
+    summary = _check(args, results)
+    gaps = _report_gaps(args, results, args.gap_report_out)
+    # simple failure policy: fail if any invalid or gaps
+    code = 1 if summary.invalid or gaps else 0
+    if args.exit_report:
+        write_exit_report(asdict(summary), gaps, code, args.exit_report)
+    return code
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    from .watch import GapTracker, SegmentWriter, deadline, latest_timestamp, make_watcher, watch
+
+    pattern = re.compile(args.pattern)
+    check = partial(
+        validate_image,
+        pattern=pattern,
+        ts_format=args.timestamp_format,
+        min_bytes=args.min_bytes,
+        flat_threshold=args.flat_frame_threshold,
+        deep=args.deep,
+        quality=args.quality,
+        min_brightness=args.min_brightness,
+        min_sharpness=args.min_sharpness,
+    )
+    tracker = GapTracker(args.gap_minutes)
+    newest = latest_timestamp(args.image_folder, pattern, args.timestamp_format)
+    if newest is not None:
+        tracker.last_file, tracker.last_ts = newest
+    segments = None
+    if args.segment_dir:
+        segments = SegmentWriter(
+            args.segment_dir, args.segment_frames, args.fps, args.codec, size=args.resize
+        )
+
+    def on_result(result: ImageValidationResult, gap: Optional[Gap]) -> None:
+        if not result.is_valid:
+            logging.warning("%s invalid: %s", result.path.name, ",".join(result.reasons))
+        elif segments is not None:
+            segments.add(result.path)
+        if gap is not None:
+            print(_format_gap(gap), flush=True)
+
+    def on_open_gap(minutes: float) -> None:
+        logging.warning("no new frame for %.1f minutes since %s", minutes, tracker.last_ts)
+
+    watcher = make_watcher(args.image_folder, polling=args.polling)
+    seen = 0
+    try:
+        for _ in watch(
+            watcher,
+            check,
+            tracker,
+            on_result,
+            on_open_gap,
+            poll_interval=args.poll_interval,
+            stop=deadline(args.duration),
+        ):
+            seen += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        if segments is not None:
+            segments.close()
+    logging.info("validated %s new files", seen)
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    from .bench import DatasetSpec, compare, generate_dataset, load_result, run_bench
+
+    if args.generate:
+        width, height = map(int, args.resolution.lower().split("x"))
+        spec = DatasetSpec(
+            frames=args.generate,
+            width=width,
+            height=height,
+            interval_seconds=args.interval_seconds,
+            gap_rate=args.gap_rate,
+            corrupt_rate=args.corrupt_rate,
+            seed=args.seed,
+        )
+        stats = generate_dataset(args.image_folder, spec)
+        logging.info(
+            "generated %s frames (%s corrupt, %s gaps) in %s",
+            stats.written,
+            stats.corrupt,
+            stats.gaps,
+            args.image_folder,
+        )
+    result = run_bench(
+        partial(_scan, args),
+        gap_minutes=args.gap_minutes,
+        sample_minutes=args.sample_minutes,
+        build=not args.no_build,
+        fps=args.fps,
+        codec=args.codec,
+        size=args.resize,
+        decode_workers=args.decode_workers,
+    )
+    data = result.to_dict(
+        workers=resolve_workers(args.workers),
+        executor=args.executor,
+        resolution=args.resolution if args.generate else None,
+    )
+    text = json.dumps(data, indent=2)
+    if args.json_out:
+        args.json_out.parent.mkdir(parents=True, exist_ok=True)
+        args.json_out.write_text(text)
+    else:
+        print(text)
+    for name, stage in result.stages.items():
+        logging.info("%s: %.0f items/s (%.2fs)", name, stage.per_second, stage.seconds)
+    if args.baseline:
+        slower = compare(data, load_result(args.baseline), args.max_slowdown)
+        if slower:
+            logging.error("slower than %s: %s", args.baseline, ", ".join(slower))
+            return 1
     return 0
 
 
+def cmd_batch(args: argparse.Namespace) -> int:
+    try:
+        jobs = load_jobs(args.jobs)
+    except ValueError as exc:
+        raise SystemExit(f"{args.jobs}: {exc}") from None
+    results = run_batch(
+        jobs,
+        lambda argv: build_parser().parse_args(argv),
+        workers=args.workers,
+        max_jobs=args.max_jobs,
+    )
+    for r in results:
+        line = f"{r.name}, {r.command}, {r.status}, {r.seconds:.1f}s"
+        print(f"{line}, {r.error}" if r.error else line)
+    if args.summary_out:
+        write_batch_summary(results, args.summary_out)
+    failed = sum(r.status != "ok" for r in results)
+    logging.info("%s jobs, %s failed", len(results), failed)
+    return 1 if failed else 0
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Timelapse dataset tool")
-    parser.add_argument("--image-folder", type=Path, required=True)
+    parser.add_argument("--image-folder", type=Path, help="required except for batch")
     parser.add_argument("--pattern", default=DEFAULT_PATTERN)
     parser.add_argument("--timestamp-format", default=DEFAULT_TS_FORMAT)
     parser.add_argument("--log-level", default="INFO", choices=["INFO", "DEBUG", "WARNING", "ERROR"])
-    parser.add_argument("--report-out", type=Path)
+    parser.add_argument("--progress", action="store_true", help="show progress and ETA on stderr")
+    parser.add_argument(
+        "--metrics-out",
+        type=Path,
+        help="periodically write per-stage metrics (JSON, or Prometheus text for .prom)",
+    )
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds")
+    parser.add_argument("--profile", type=Path, help="write cProfile stats of the run here")
+    parser.add_argument(
+        "--report-out", type=Path, help="report file (.csv, .json, .jsonl or .npz)"
+    )
 
     sub = parser.add_subparsers(dest="command", required=True)
 
     p_check = sub.add_parser("check", help="validate images")
-    p_check.add_argument("--min-bytes", type=int, default=5000)
-    p_check.add_argument("--flat-frame-threshold", type=float)
+    _add_scan_options(p_check)
     p_check.set_defaults(func=cmd_check)
 
     p_gaps = sub.add_parser("report-gaps", help="report timestamp gaps")
-    p_gaps.add_argument("--min-bytes", type=int, default=5000)
-    p_gaps.add_argument("--flat-frame-threshold", type=float)
+    _add_scan_options(p_gaps)
     p_gaps.add_argument("--gap-minutes", type=int, default=10)
+    p_gaps.add_argument(
+        "--no-decode",
+        action="store_true",
+        help="judge frames by file name and size only; never opens the images",
+    )
+    _add_frozen_options(p_gaps)
     p_gaps.set_defaults(func=cmd_report_gaps)
 
     p_build = sub.add_parser("build", help="build video")
-    p_build.add_argument("--min-bytes", type=int, default=5000)
-    p_build.add_argument("--flat-frame-threshold", type=float)
-    p_build.add_argument("--output-video", type=Path, required=True)
+    _add_scan_options(p_build)
+    p_build.add_argument("--output-video", type=Path)
+    p_build.add_argument(
+        "--output",
+        type=_output_spec,
+        action="append",
+        metavar="PATH[,size=WxH][,codec=C][,fps=N]",
+        help="additional output encoded from the same decoded frames (repeatable)",
+    )
     p_build.add_argument("--fps", type=int, default=30)
     p_build.add_argument("--codec", type=str, default="mp4v")
-    p_build.add_argument("--resize")
+    p_build.add_argument("--resize", type=_frame_size, metavar="WxH")
     p_build.add_argument("--sample-minutes", type=int)
+    p_build.add_argument(
+        "--sample-mode",
+        choices=SAMPLE_MODES,
+        default="interval",
+        help="interval: at least --sample-minutes apart; grid: nearest frame per "
+        "--sample-minutes slot; count: --sample-count or --target-seconds frames",
+    )
+    p_build.add_argument("--sample-count", type=int)
+    p_build.add_argument("--target-seconds", type=float, help="output duration at --fps")
+    p_build.add_argument(
+        "--fill-gaps", action="store_true", help="repeat frames across gaps (grid/count)"
+    )
+    _add_frozen_options(p_build)
+    p_build.add_argument(
+        "--drop-frozen",
+        action="store_true",
+        help="keep only the first frame of each frozen run (needs --frozen-frames)",
+    )
     p_build.add_argument("--strict", action="store_true")
     p_build.add_argument("--dry-run", action="store_true")
+    p_build.add_argument(
+        "--decode-workers",
+        type=_worker_count,
+        default=0,
+        help="threads decoding ahead of the encoder",
+    )
+    p_build.add_argument("--queue-depth", type=int, help="decoded frames buffered for the encoder")
+    p_build.add_argument(
+        "--segment-frames", type=int, help="encode resumable segments of this many frames"
+    )
+    p_build.add_argument(
+        "--segment-workers",
+        type=_worker_count,
+        default=0,
+        help="segment encoders (0 = one per core)",
+    )
+    p_build.add_argument(
+        "--frame-cache",
+        nargs="?",
+        const="",
+        help="reuse decoded frames of earlier builds at the same size "
+        f"(default folder: <image-folder>/{DEFAULT_FRAME_CACHE_NAME})",
+    )
+    p_build.add_argument(
+        "--frame-cache-mb",
+        type=int,
+        default=DEFAULT_FRAME_CACHE_MB,
+        help="size cap of the frame cache; least recently used days are evicted",
+    )
+    p_build.add_argument(
+        "--deflicker",
+        action="store_true",
+        help="scale each frame towards the rolling mean brightness of its neighbours",
+    )
+    p_build.add_argument(
+        "--deflicker-window",
+        type=int,
+        default=DEFAULT_DEFLICKER_WINDOW,
+        help="frames in the rolling brightness window",
+    )
+    p_build.add_argument(
+        "--deflicker-max-gain",
+        type=float,
+        default=DEFAULT_MAX_GAIN,
+        help="largest brightening (or inverse darkening) of a single frame",
+    )
     p_build.set_defaults(func=cmd_build)
 
     p_test = sub.add_parser("test-dataset", help="quick integrity test")
-    p_test.add_argument("--min-bytes", type=int, default=5000)
-    p_test.add_argument("--flat-frame-threshold", type=float)
+    _add_scan_options(p_test)
     p_test.add_argument("--gap-minutes", type=int, default=10)
+    p_test.add_argument("--gap-report-out", type=Path, help="gap report (.csv, .json, .jsonl or .npz)")
+    _add_frozen_options(p_test)
+    p_test.add_argument("--exit-report", type=Path, help="JSON summary of the test outcome")
     p_test.set_defaults(func=cmd_test_dataset)
 
+    p_watch = sub.add_parser("watch", help="validate new frames as they arrive")
+    # frames are checked one by one as they arrive, so the folder scan
+    # options (workers, cache, recursion, time range) do not apply
+    _add_check_options(p_watch)
+    p_watch.add_argument("--gap-minutes", type=int, default=10)
+    p_watch.add_argument("--poll-interval", type=float, default=1.0)
+    p_watch.add_argument("--polling", action="store_true", help="poll instead of using inotify")
+    p_watch.add_argument("--duration", type=float, help="stop after this many seconds")
+    p_watch.add_argument("--segment-dir", type=Path, help="append valid frames to videos here")
+    p_watch.add_argument("--segment-frames", type=int, default=1800)
+    p_watch.add_argument("--fps", type=int, default=30)
+    p_watch.add_argument("--codec", type=str, default="mp4v")
+    p_watch.add_argument("--resize", type=_frame_size, metavar="WxH")
+    p_watch.set_defaults(func=cmd_watch)
+
+    p_bench = sub.add_parser("bench", help="time each pipeline stage")
+    _add_scan_options(p_bench)
+    p_bench.add_argument(
+        "--generate", type=int, metavar="FRAMES", help="first write a synthetic dataset"
+    )
+    p_bench.add_argument("--resolution", default="640x360", help="synthetic frame size")
+    p_bench.add_argument("--interval-seconds", type=int, default=60)
+    p_bench.add_argument("--gap-rate", type=float, default=0.0, help="outages per frame slot")
+    p_bench.add_argument("--corrupt-rate", type=float, default=0.0, help="truncated frames")
+    p_bench.add_argument("--seed", type=int, default=0)
+    p_bench.add_argument("--gap-minutes", type=int, default=10)
+    p_bench.add_argument("--sample-minutes", type=int)
+    p_bench.add_argument("--no-build", action="store_true", help="skip the encoding stage")
+    p_bench.add_argument("--fps", type=int, default=30)
+    p_bench.add_argument("--codec", type=str, default="mp4v")
+    p_bench.add_argument("--resize", type=_frame_size, metavar="WxH")
+    p_bench.add_argument("--decode-workers", type=_worker_count, default=0)
+    p_bench.add_argument("--json-out", type=Path, help="write the results here, not stdout")
+    p_bench.add_argument("--baseline", type=Path, help="earlier --json-out to compare with")
+    p_bench.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=1.25,
+        help="fail when a stage is this many times slower than --baseline",
+    )
+    p_bench.set_defaults(func=cmd_bench)
+
+    p_batch = sub.add_parser("batch", help="run the jobs of many cameras on one worker pool")
+    p_batch.add_argument("--jobs", type=Path, required=True, help="JSON jobs file")
+    p_batch.add_argument(
+        "--workers", type=_worker_count, default=0, help="shared worker threads (0 = one per core)"
+    )
+    p_batch.add_argument("--max-jobs", type=int, help="jobs driven at once (default: all)")
+    p_batch.add_argument("--summary-out", type=Path, help="per-job outcome as JSON")
+    p_batch.set_defaults(func=cmd_batch)
+
     return parser
 
 
+def _add_check_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--min-bytes", type=int, default=5000)
+    parser.add_argument("--flat-frame-threshold", type=float)
+    parser.add_argument(
+        "--deep", action="store_true", help="fully decode every image instead of header checks"
+    )
+    parser.add_argument(
+        "--quality",
+        action="store_true",
+        help="record brightness, sharpness and a difference hash per frame",
+    )
+    parser.add_argument("--min-brightness", type=float, help="reject darker frames as 'dark'")
+    parser.add_argument(
+        "--min-sharpness", type=float, help="reject frames with a lower Laplacian variance"
+    )
+
+
+def _add_scan_options(parser: argparse.ArgumentParser) -> None:
+    _add_check_options(parser)
+    parser.add_argument(
+        "--workers", type=_worker_count, default=1, help="validation workers (0 = one per core)"
+    )
+    parser.add_argument("--executor", choices=EXECUTORS, default="thread")
+    parser.add_argument(
+        "--recursive", action="store_true", help="also scan YYYY/MM/DD sub-folders"
+    )
+    parser.add_argument(
+        "--start", type=datetime.fromisoformat, help="first timestamp to include (ISO 8601)"
+    )
+    parser.add_argument(
+        "--end", type=datetime.fromisoformat, help="last timestamp to include (ISO 8601)"
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const="",
+        help=f"reuse validation results (default file: <image-folder>/{DEFAULT_CACHE_NAME})",
+    )
+
+
+def _add_frozen_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--frozen-frames",
+        type=int,
+        help="report runs of this many near-identical frames as frozen gaps",
+    )
+    parser.add_argument(
+        "--frozen-distance",
+        type=int,
+        default=FROZEN_DISTANCE,
+        help="maximum differing hash bits between frames of a frozen run",
+    )
+
+
+def _log_stages() -> None:
+    snapshot = METRICS.snapshot()
+    stages = snapshot["stages"]
+    for name, s in stages.items():  # type: ignore[attr-defined]
+        logging.info("stage %-8s %9.2fs over %s calls", name, s["seconds"], s["count"])
+    if snapshot["bottleneck"]:
+        logging.info("slowest stage: %s", snapshot["bottleneck"])
+
+
+def _profiled(args: argparse.Namespace) -> int:
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(args.func, args)
+    finally:
+        profiler.dump_stats(str(args.profile))
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+        logging.debug("profile written to %s\n%s", args.profile, out.getvalue())
+
+
 def main(argv: Optional[List[str]] = None) -> int:
     parser = build_parser()
     args = parser.parse_args(argv)
+    if args.image_folder is None and args.command != "batch":
+        parser.error("--image-folder is required")
     _setup_logging(args.log_level)
-    return args.func(args)
+    if args.progress or args.metrics_out:
+        METRICS.enable()
+    with ExitStack() as stack:
+        if args.metrics_out:
+            stack.enter_context(MetricsDumper(args.metrics_out, args.metrics_interval))
+        code = _profiled(args) if args.profile else args.func(args)
+    if METRICS.enabled:
+        _log_stages()
+    return code
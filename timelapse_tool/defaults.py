@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+"""Default settings shared by the library and the command line.
+
+Kept free of NumPy and OpenCV imports so that building the argument parser
+stays cheap; the modules using these values re-export them.
+"""
+
+from .io_utils import TOOL_PREFIX
+
+# maximum differing hash bits for two frames to count as identical
+FROZEN_DISTANCE = 2
+
+SAMPLE_MODES = ("interval", "grid", "count")
+
+DEFAULT_FRAME_CACHE_NAME = TOOL_PREFIX + "frames"
+DEFAULT_FRAME_CACHE_MB = 4096
+
+# frames averaged into the target brightness of each frame
+DEFAULT_DEFLICKER_WINDOW = 15
+# strongest brightening, or inverse darkening, applied to one frame
+DEFAULT_MAX_GAIN = 2.0
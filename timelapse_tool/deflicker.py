@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+"""Exposure smoothing computed from per-frame brightness statistics."""
+
+from typing import Iterable
+
+import numpy as np
+
+from .defaults import DEFAULT_DEFLICKER_WINDOW, DEFAULT_MAX_GAIN
+from .validate import ImageValidationResult
+
+
+def brightness_of(images: Iterable[ImageValidationResult]) -> np.ndarray:
+    """Return the brightness recorded during validation, ``nan`` where missing."""
+    return np.array(
+        [np.nan if r.brightness is None else r.brightness for r in images], dtype=np.float64
+    )
+
+
+def target_curve(brightness: np.ndarray, window: int) -> np.ndarray:
+    """Return the centred rolling mean of *brightness* over *window* frames.
+
+    Missing (``nan``) values are left out of each mean and the window is
+    cut short at both ends of the sequence.  The means come from cumulative
+    sums, so the cost per frame does not depend on *window*.
+    """
+    n = len(brightness)
+    known = np.isfinite(brightness)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(known, brightness, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(known)))
+    first = np.arange(n) - window // 2
+    start = np.clip(first, 0, n)
+    stop = np.clip(first + window, 0, n)
+    total = counts[stop] - counts[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (sums[stop] - sums[start]) / total, np.nan)
+
+
+def deflicker_gains(
+    brightness: np.ndarray,
+    window: int = DEFAULT_DEFLICKER_WINDOW,
+    max_gain: float = DEFAULT_MAX_GAIN,
+) -> np.ndarray:
+    """Return the gain bringing each frame to the :func:`target_curve`.
+
+    Gains are limited to ``[1 / max_gain, max_gain]``; frames without a
+    brightness, or entirely black, keep a gain of 1.
+    """
+    if window < 1:
+        raise ValueError("deflicker window must be at least one frame")
+    if max_gain < 1:
+        raise ValueError("max_gain must be at least 1")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gains = target_curve(brightness, window) / brightness
+    gains = np.where(np.isfinite(gains) & (brightness > 0), gains, 1.0)
+    return np.clip(gains, 1 / max_gain, max_gain)
+
+
+def gain_lut(gain: float) -> np.ndarray:
+    """Return the 256-entry ``uint8`` table multiplying pixel values by *gain*."""
+    return np.clip(np.rint(np.arange(256) * gain), 0, 255).astype(np.uint8)
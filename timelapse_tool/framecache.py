@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+"""Memory-mapped cache of decoded, resized frames."""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
+import calendar
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: day files are not locked between processes
+    fcntl = None  # type: ignore[assignment]
+
+from .defaults import DEFAULT_FRAME_CACHE_MB
+from .defaults import DEFAULT_FRAME_CACHE_NAME  # noqa: F401 (re-exported)
+from .validate import ImageValidationResult
+
+_CHANNELS = 3
+
+
+@contextmanager
+def _locked(f: IO[bytes]) -> Iterator[None]:
+    """Hold an exclusive lock on *f* against other processes."""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class _DayFile:
+    """Frames of one day at one size, appended to a fixed-stride raw file.
+
+    The index maps the frame timestamp (epoch seconds) to its slot, along
+    with the source name and size so that a replaced image is re-decoded.
+
+    Appends and index updates hold a lock on the raw file, so several
+    processes may share a day.  Each frame is written at the offset of the
+    slot given by the whole frames in the file, cutting off a frame torn by
+    a killed run; frames appended after the last saved index are simply
+    unreferenced.
+    """
+
+    def __init__(self, raw: Path, size: Tuple[int, int]) -> None:
+        self.raw = raw
+        self.index_path = raw.with_suffix(".json")
+        self.size = size
+        self.stride = size[0] * size[1] * _CHANNELS
+        self.entries = self._read_index()
+        self._added: Dict[str, List[object]] = {}
+        self._map: Optional[np.memmap] = None
+        self._file: Optional[IO[bytes]] = None
+
+    def _read_index(self) -> Dict[str, List[object]]:
+        if not self.index_path.exists():
+            return {}
+        return json.loads(self.index_path.read_text())["entries"]
+
+    def lookup(self, key: str, name: str, size_bytes: int) -> Optional[int]:
+        entry = self.entries.get(key)
+        if entry is None or entry[1] != name or entry[2] != size_bytes:
+            return None
+        return int(entry[0])  # type: ignore[call-overload]
+
+    def view(self, slot: int) -> np.ndarray:
+        if self._map is None or slot >= len(self._map):
+            w, h = self.size
+            slots = self.raw.stat().st_size // self.stride
+            self._map = np.memmap(self.raw, dtype=np.uint8, mode="r", shape=(slots, h, w, 3))
+        return self._map[slot]
+
+    def append(self, key: str, name: str, size_bytes: int, frame: np.ndarray) -> None:
+        if self._file is None:
+            self.raw.touch()
+            self._file = self.raw.open("r+b")
+        with _locked(self._file):
+            slot = self._file.seek(0, os.SEEK_END) // self.stride
+            if self._file.tell() != slot * self.stride:
+                self._file.seek(slot * self.stride)
+                self._file.truncate()
+            self._file.write(np.ascontiguousarray(frame).data)
+            self._file.flush()
+        self.entries[key] = self._added[key] = [slot, name, size_bytes]
+
+    def close(self) -> None:
+        self._map = None
+        if self._file is not None:
+            if self._added:
+                with _locked(self._file):
+                    # keep the entries other processes saved since the index was read
+                    self.entries = {**self._read_index(), **self._added}
+                    tmp = self.index_path.with_suffix(".tmp")
+                    w, h = self.size
+                    tmp.write_text(json.dumps({"width": w, "height": h, "entries": self.entries}))
+                    tmp.replace(self.index_path)
+                self._added = {}
+            self._file.close()
+            self._file = None
+        if self.index_path.exists():
+            # the index mtime records when the day was last used
+            os.utime(self.index_path)
+
+
+class FrameCache:
+    """Decoded frames stored per day in memory-mapped raw files.
+
+    Frames are kept at the output size, so a later build at the same size
+    gets zero-copy views of the mapped file instead of decoding JPEGs.  When
+    the files below *root* exceed ``max_bytes``, whole days are evicted,
+    least recently used first; days used by the current build are kept.
+    The cache is safe to use from decode threads of one process.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_FRAME_CACHE_MB << 20) -> None:
+        root.mkdir(parents=True, exist_ok=True)
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._days: Dict[Tuple[str, Tuple[int, int]], _DayFile] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "FrameCache":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    @staticmethod
+    def _key(img: ImageValidationResult) -> Optional[Tuple[str, str]]:
+        if img.timestamp is None:
+            return None
+        # the naive timestamp is read as UTC, so keys do not move with TZ or DST
+        seconds = calendar.timegm(img.timestamp.timetuple())
+        return img.timestamp.date().isoformat(), str(seconds)
+
+    def _day(self, day: str, size: Tuple[int, int]) -> _DayFile:
+        f = self._days.get((day, size))
+        if f is None:
+            f = _DayFile(self.root / f"{day}_{size[0]}x{size[1]}.raw", size)
+            self._days[(day, size)] = f
+            self._evict()
+        return f
+
+    def get(self, img: ImageValidationResult, size: Tuple[int, int]) -> Optional[np.ndarray]:
+        """Return a read-only view of the cached frame of *img*, if any."""
+        key = self._key(img)
+        if key is None:
+            return None
+        with self._lock:
+            f = self._day(key[0], size)
+            slot = f.lookup(key[1], img.path.name, img.size_bytes)
+            if slot is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return f.view(slot)
+
+    def put(self, img: ImageValidationResult, frame: np.ndarray) -> None:
+        """Store *frame*, already resized to the output size, for *img*."""
+        key = self._key(img)
+        if key is None:
+            return
+        size = (frame.shape[1], frame.shape[0])
+        with self._lock:
+            self._day(key[0], size).append(key[1], img.path.name, img.size_bytes, frame)
+
+    def _evict(self) -> None:
+        in_use: Set[Path] = {f.raw for f in self._days.values()}
+        files = []
+        total = 0
+        for raw in self.root.glob("*.raw"):
+            index = raw.with_suffix(".json")
+            used = index.stat().st_mtime if index.exists() else 0.0
+            size = raw.stat().st_size
+            files.append((used, raw, size))
+            total += size
+        for _, raw, size in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if raw in in_use:
+                continue
+            logging.debug("frame cache: evicting %s", raw.name)
+            raw.unlink()
+            raw.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+
+    def close(self) -> None:
+        with self._lock:
+            for f in self._days.values():
+                f.close()
+            self._evict()
+            self._days.clear()
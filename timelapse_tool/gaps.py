@@ -5,35 +5,139 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, List
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
 
+from .defaults import FROZEN_DISTANCE
 from .validate import ImageValidationResult
 
+if TYPE_CHECKING:
+    import numpy as np
 
-@dataclass
+
+@dataclass(slots=True)
 class Gap:
+    """A stretch without usable frames.
+
+    ``kind`` is ``"time"`` for missing frames and ``"frozen"`` for a run of
+    near-identical frames written by a stuck camera; the latter spans from
+    the first to the last frame of the run.
+    """
+
     prev_file: Path
     prev_ts: datetime
     next_file: Path
     next_ts: datetime
     gap_minutes: float
+    kind: str = "time"
+
+
+def _same_as_previous(hashes: np.ndarray, max_distance: int) -> np.ndarray:
+    """For each hash after the first, whether it matches its predecessor."""
+    import numpy as np
+
+    diff = (hashes[1:] ^ hashes[:-1]).astype(">u8").view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(diff, axis=1).sum(axis=1) <= max_distance
+
+
+def frozen_runs(
+    hashes: List[Optional[int]], min_run: int, max_distance: int = FROZEN_DISTANCE
+) -> List[Tuple[int, int]]:
+    """Return ``(first, last)`` indices of runs of at least ``min_run`` frames
+    whose consecutive hashes differ by at most ``max_distance`` bits."""
+    if len(hashes) < 2:
+        return []
+    # NumPy is only needed here, so gap reports without frozen runs skip it
+    import numpy as np
+
+    known = np.array([h is not None for h in hashes])
+    arr = np.array([h or 0 for h in hashes], dtype=np.uint64)
+    same = _same_as_previous(arr, max_distance) & known[1:] & known[:-1]
+    # run boundaries in the boolean "same as previous" sequence
+    edges = np.diff(np.concatenate(([0], same.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return [(int(a), int(b)) for a, b in zip(starts, ends) if b - a + 1 >= min_run]
 
 
-def find_gaps(images: Iterable[ImageValidationResult], gap_minutes: int) -> List[Gap]:
-    """Return gaps greater than ``gap_minutes`` between consecutive images."""
+def find_gaps(
+    images: Iterable[ImageValidationResult],
+    gap_minutes: int,
+    frozen_frames: Optional[int] = None,
+    frozen_distance: int = FROZEN_DISTANCE,
+) -> List[Gap]:
+    """Return gaps greater than ``gap_minutes`` between consecutive images.
+
+    With ``frozen_frames``, runs of at least that many consecutive frames whose
+    difference hashes (see :mod:`~timelapse_tool.quality`) are within
+    ``frozen_distance`` bits are reported as ``"frozen"`` gaps too.
+    """
     imgs = [img for img in images if img.timestamp is not None]
     imgs.sort(key=lambda i: i.timestamp)
     gaps: List[Gap] = []
     for prev, nxt in zip(imgs, imgs[1:]):
-        delta = (nxt.timestamp - prev.timestamp).total_seconds() / 60.0
+        delta = (nxt.timestamp - prev.timestamp).total_seconds() / 60.0  # type: ignore[operator]
         if delta > gap_minutes:
             gaps.append(
                 Gap(
                     prev_file=prev.path,
-                    prev_ts=prev.timestamp,  # type: ignore[union-attr]
+                    prev_ts=prev.timestamp,  # type: ignore[arg-type]
                     next_file=nxt.path,
-                    next_ts=nxt.timestamp,  # type: ignore[union-attr]
+                    next_ts=nxt.timestamp,  # type: ignore[arg-type]
                     gap_minutes=delta,
                 )
             )
+    if frozen_frames:
+        for a, b in frozen_runs([img.dhash for img in imgs], frozen_frames, frozen_distance):
+            first, last = imgs[a], imgs[b]
+            span = last.timestamp - first.timestamp  # type: ignore[operator]
+            gaps.append(
+                Gap(
+                    prev_file=first.path,
+                    prev_ts=first.timestamp,  # type: ignore[arg-type]
+                    next_file=last.path,
+                    next_ts=last.timestamp,  # type: ignore[arg-type]
+                    gap_minutes=span.total_seconds() / 60.0,
+                    kind="frozen",
+                )
+            )
+        gaps.sort(key=lambda g: g.prev_ts)
     return gaps
+
+
+def iter_drop_frozen(
+    images: Iterable[ImageValidationResult],
+    frozen_frames: int,
+    frozen_distance: int = FROZEN_DISTANCE,
+) -> Iterator[ImageValidationResult]:
+    """Yield *images* without the repeats of frozen runs.
+
+    A run of at least ``frozen_frames`` near-identical consecutive frames is
+    reduced to its first frame; shorter runs are kept.  At most
+    ``frozen_frames`` images are buffered, so this works on streams.
+    """
+    from .quality import hamming
+
+    run: List[ImageValidationResult] = []
+    last: Optional[ImageValidationResult] = None
+    frozen = False
+    for img in images:
+        same = (
+            last is not None
+            and img.dhash is not None
+            and last.dhash is not None
+            and hamming(img.dhash, last.dhash) <= frozen_distance
+        )
+        last = img
+        if same:
+            if frozen:
+                continue
+            run.append(img)
+            if len(run) >= frozen_frames:
+                frozen = True
+                yield run[0]
+                run = []
+            continue
+        yield from run
+        run = [img]
+        frozen = False
+    yield from run
@@ -2,10 +2,165 @@ from __future__ import annotations
 
 """Helpers for filesystem interactions."""
 
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from typing import Iterable
+from typing import Iterator, List, Optional, Pattern, Tuple
+import os
 
+from .metrics import timed
+from .parsing import FIXED_FORMAT, parse_timestamp
+
+
+@dataclass(slots=True)
+class FileEntry:
+    """A listed file together with the stat fields the tool needs."""
+
+    path: Path
+    size: int
+    mtime_ns: int
+
+
+# name prefix of the files and folders the tool itself writes next to the
+# images (validation cache, its journals, frame cache); never listed
+TOOL_PREFIX = ".timelapse_"
+
+# digits in the YYYY, MM and DD levels of a date-partitioned tree
+_DATE_LEVELS = (4, 2, 2)
+
+
+def _date_prefix(parts: Tuple[str, ...]) -> Optional[Tuple[int, ...]]:
+    """Return the date prefix encoded by nested directory names, if any."""
+    if len(parts) > len(_DATE_LEVELS):
+        return None
+    for part, width in zip(parts, _DATE_LEVELS):
+        if len(part) != width or not part.isdigit():
+            return None
+    return tuple(int(p) for p in parts)
+
+
+def _prefix_in_range(
+    prefix: Tuple[int, ...], start: Optional[datetime], end: Optional[datetime]
+) -> bool:
+    n = len(prefix)
+    if start is not None and prefix < (start.year, start.month, start.day)[:n]:
+        return False
+    if end is not None and prefix > (end.year, end.month, end.day)[:n]:
+        return False
+    return True
+
+
+def _select_range(
+    files: List[os.DirEntry],
+    pattern: Pattern[str],
+    ts_format: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> List[os.DirEntry]:
+    """Return the *files* timestamped within ``start``..``end`` in time order.
+
+    For the fixed-width default format the captured digits sort like the
+    timestamps themselves, so the range is located with a binary search and
+    only the selected names are parsed.
+    """
+    if ts_format == FIXED_FORMAT:
+        keyed = []
+        for e in files:
+            m = pattern.match(e.name)
+            if m:
+                keyed.append((m.group(1), e))
+        keyed.sort(key=lambda k: k[0])
+        keys = [k for k, _ in keyed]
+        lo = bisect_left(keys, f"{start:{FIXED_FORMAT}}") if start else 0
+        hi = bisect_right(keys, f"{end:{FIXED_FORMAT}}") if end else len(keys)
+        candidates = [e for _, e in keyed[lo:hi]]
+    else:
+        candidates = files
+    selected = []
+    for e in candidates:
+        ts = parse_timestamp(e.name, pattern, ts_format).timestamp
+        if ts is None or (start and ts < start) or (end and ts > end):
+            continue
+        selected.append((ts, e))
+    selected.sort(key=lambda k: k[0])
+    return [e for _, e in selected]
+
+
+def _iter_dir_entries(
+    folder: Path,
+    recursive: bool,
+    pattern: Optional[Pattern[str]],
+    ts_format: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> Iterator[os.DirEntry]:
+    """Yield the selected directory entries of :func:`iter_entries`, unstat-ed."""
+    use_range = pattern is not None and ts_format is not None and (start or end)
+
+    def walk(directory: Path, parts: Tuple[str, ...]) -> Iterator[os.DirEntry]:
+        with timed("list"):
+            with os.scandir(directory) as it:
+                entries: List[os.DirEntry] = sorted(it, key=lambda e: e.name)
+            files = [e for e in entries if e.is_file() and not e.name.startswith(TOOL_PREFIX)]
+            if use_range:
+                files = _select_range(files, pattern, ts_format, start, end)  # type: ignore[arg-type]
+        yield from files
+        if not recursive:
+            return
+        for entry in entries:
+            # hidden folders hold the tool's own caches
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            sub = parts + (entry.name,)
+            prefix = _date_prefix(sub)
+            if prefix is not None and not _prefix_in_range(prefix, start, end):
+                continue
+            yield from walk(Path(entry.path), sub)
+
+    yield from walk(folder, ())
+
+
+def count_entries(
+    folder: Path,
+    recursive: bool = False,
+    pattern: Optional[Pattern[str]] = None,
+    ts_format: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> int:
+    """Return how many files :func:`iter_entries` would yield, without any stat."""
+    return sum(1 for _ in _iter_dir_entries(folder, recursive, pattern, ts_format, start, end))
+
+
+def iter_entries(
+    folder: Path,
+    recursive: bool = False,
+    pattern: Optional[Pattern[str]] = None,
+    ts_format: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[FileEntry]:
+    """Yield the files below *folder* with their stat fields.
+
+    The listing uses :func:`os.scandir`, so file types come from the
+    directory itself and every file is stat-ed exactly once.  Files of a
+    folder are yielded in name order (timestamp order for fixed-width
+    names) before its sub-folders, which are only walked with
+    ``recursive``; ``YYYY/MM/DD`` folders outside ``start``..``end`` are
+    skipped from their names alone.  The tool's own files, named with
+    :data:`TOOL_PREFIX`, are never listed.
+
+    When a range is given, only files whose name matches *pattern* with a
+    timestamp inside the range are kept, in timestamp order.  They are
+    selected from the names before any stat is issued.
+    """
+    for entry in _iter_dir_entries(folder, recursive, pattern, ts_format, start, end):
+        try:
+            with timed("stat"):
+                st = entry.stat()
+        except OSError:
+            # removed between listing and stat
+            continue
+        yield FileEntry(Path(entry.path), st.st_size, st.st_mtime_ns)
 
-def iter_files(folder: Path) -> Iterable[Path]:
-    """Yield files in *folder* sorted by name."""
-    return sorted([p for p in folder.iterdir() if p.is_file()])
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+"""Minimal JPEG header parsing without decoding pixel data."""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+
+# SOFn markers carrying frame dimensions (DHT, JPG and DAC share the range)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# markers that stand alone without a length field
+_STANDALONE = frozenset(range(0xD0, 0xD8)) | {0x01, 0xD8}
+_SOS = 0xDA
+# bytes inspected at the end of the file when looking for EOI
+_TRAILER_BYTES = 64
+
+
+@dataclass
+class JpegHeader:
+    """Dimensions and integrity information read from a JPEG header."""
+
+    width: int
+    height: int
+    truncated: bool
+
+
+def is_jpeg(path: Path) -> bool:
+    """Return ``True`` if *path* starts with the JPEG SOI marker."""
+    try:
+        with path.open("rb") as f:
+            return f.read(2) == SOI
+    except OSError:
+        return False
+
+
+def _read_sof(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """Walk the marker segments of *f* until a SOF marker is found."""
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            # garbage between segments means the stream is corrupt
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in _STANDALONE:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) != 2:
+            return None
+        length = int.from_bytes(length_bytes, "big")
+        if length < 2:
+            return None
+        if code in _SOF_MARKERS:
+            data = f.read(5)
+            if len(data) != 5:
+                return None
+            height = int.from_bytes(data[1:3], "big")
+            width = int.from_bytes(data[3:5], "big")
+            return width, height
+        if code == _SOS:
+            # entropy coded data started before any frame header
+            return None
+        f.seek(length - 2, 1)
+
+
+def read_jpeg_header(path: Path) -> Optional[JpegHeader]:
+    """Return the dimensions of the JPEG at *path* or ``None`` if corrupt.
+
+    Only the marker segments up to the frame header and the last few bytes of
+    the file are read.  ``truncated`` is set when the file does not end with
+    the EOI marker (zero padding written by some cameras is ignored).
+    """
+    try:
+        with path.open("rb") as f:
+            if f.read(2) != SOI:
+                return None
+            dims = _read_sof(f)
+            if dims is None or 0 in dims:
+                return None
+            f.seek(0, 2)
+            size = f.tell()
+            f.seek(max(0, size - _TRAILER_BYTES))
+            tail = f.read().rstrip(b"\x00")
+    except OSError:
+        return None
+    width, height = dims
+    return JpegHeader(width=width, height=height, truncated=not tail.endswith(EOI))
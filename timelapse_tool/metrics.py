@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+"""Per-stage timers, progress display and metrics dumps."""
+
+from contextlib import nullcontext
+from pathlib import Path
+from typing import ContextManager, Dict, Iterable, Iterator, Optional, TextIO, TypeVar
+import json
+import sys
+import threading
+import time
+
+T = TypeVar("T")
+
+# hot-path stages, in pipeline order
+STAGES = (
+    "list",
+    "stat",
+    "parse",
+    "header",
+    "decode",
+    "analysis",
+    "resize",
+    "flat",
+    "deflicker",
+    "encode",
+)
+
+_NULL = nullcontext()
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_stage", "_start")
+
+    def __init__(self, metrics: "Metrics", stage: str) -> None:
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc: object) -> None:
+        self._metrics.add(self._stage, time.perf_counter() - self._start)
+
+
+class Metrics:
+    """Thread-safe per-stage call counts and cumulative seconds.
+
+    Collection is off until :meth:`enable` is called; :meth:`time` then
+    returns a shared no-op context manager, so instrumented code costs one
+    attribute check per call.  Stages run in worker processes (``--executor
+    process``) are recorded in those processes and not reported.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._seconds: Dict[str, float] = {}
+        self.items = 0
+        self.started = time.monotonic()
+
+    def enable(self) -> None:
+        self.reset()
+        self.enabled = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._seconds.clear()
+            self.items = 0
+            self.started = time.monotonic()
+
+    def time(self, stage: str) -> ContextManager[None]:
+        """Return a context manager adding its duration to *stage*."""
+        return _Timer(self, stage) if self.enabled else _NULL
+
+    def add(self, stage: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            self._counts[stage] = self._counts.get(stage, 0) + count
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+
+    def tick(self, n: int = 1) -> None:
+        """Count *n* items through the pipeline, for progress and rates."""
+        with self._lock:
+            self.items += n
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            stages = {
+                name: {"count": self._counts[name], "seconds": self._seconds[name]}
+                for name in sorted(self._counts, key=_stage_order)
+            }
+            items = self.items
+        busiest = max(stages, key=lambda s: stages[s]["seconds"], default=None)
+        return {
+            "elapsed_seconds": elapsed,
+            "items": items,
+            "items_per_second": items / elapsed if elapsed else 0.0,
+            "bottleneck": busiest,
+            "stages": stages,
+        }
+
+
+def _stage_order(name: str) -> int:
+    return STAGES.index(name) if name in STAGES else len(STAGES)
+
+
+# process-wide registry used by the instrumented modules
+METRICS = Metrics()
+
+
+def timed(stage: str) -> ContextManager[None]:
+    """Shorthand for ``METRICS.time(stage)``."""
+    return METRICS.time(stage)
+
+
+def to_prometheus(snapshot: Dict[str, object], prefix: str = "timelapse") -> str:
+    """Render *snapshot* in the Prometheus text exposition format."""
+    lines = [
+        f"# TYPE {prefix}_items_total counter",
+        f"{prefix}_items_total {snapshot['items']}",
+        f"# TYPE {prefix}_elapsed_seconds gauge",
+        f"{prefix}_elapsed_seconds {snapshot['elapsed_seconds']:.3f}",
+        f"# TYPE {prefix}_stage_calls_total counter",
+    ]
+    stages: Dict[str, Dict[str, float]] = snapshot["stages"]  # type: ignore[assignment]
+    for name, s in stages.items():
+        lines.append(f'{prefix}_stage_calls_total{{stage="{name}"}} {s["count"]}')
+    lines.append(f"# TYPE {prefix}_stage_seconds_total counter")
+    for name, s in stages.items():
+        lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {s["seconds"]:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: Path, snapshot: Dict[str, object]) -> None:
+    """Atomically write *snapshot* as JSON, or Prometheus text for ``.prom``."""
+    if path.suffix.lower() == ".prom":
+        text = to_prometheus(snapshot)
+    else:
+        text = json.dumps(snapshot, indent=2)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
+
+
+class MetricsDumper:
+    """Write :data:`METRICS` to *path* every *interval* seconds and on exit."""
+
+    def __init__(self, path: Path, interval: float = 10.0, metrics: Metrics = METRICS) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+
+    def __enter__(self) -> "MetricsDumper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        self._thread.join()
+        write_metrics(self.path, self.metrics.snapshot())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            write_metrics(self.path, self.metrics.snapshot())
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+
+class Progress:
+    """Single-line progress, rate and ETA display on a terminal stream.
+
+    The line is redrawn at most every *interval* seconds.  Without a known
+    *total* only the count and rate are shown.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        total: Optional[int] = None,
+        interval: float = 1.0,
+        stream: Optional[TextIO] = None,
+        metrics: Metrics = METRICS,
+    ) -> None:
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.metrics = metrics
+        self.count = 0
+        self._start = time.monotonic()
+        self._last_draw = 0.0
+        self._drawn = 0
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self._start
+        rate = self.count / elapsed if elapsed else 0.0
+        text = f"{self.label}: {self.count}"
+        if self.total:
+            text += f"/{self.total} ({100 * self.count / self.total:.0f}%)"
+        text += f" {rate:.1f}/s"
+        if self.total and rate:
+            text += f" ETA {_format_duration(max(0, self.total - self.count) / rate)}"
+        bottleneck = self.metrics.snapshot()["bottleneck"] if self.metrics.enabled else None
+        if bottleneck:
+            text += f" [{bottleneck}]"
+        return text
+
+    def update(self, n: int = 1) -> None:
+        self.count += n
+        now = time.monotonic()
+        if now - self._last_draw >= self.interval:
+            self._last_draw = now
+            self._draw()
+
+    def _draw(self, end: str = "") -> None:
+        text = self.line()
+        # pad over the remains of a longer previous line
+        self.stream.write("\r" + text.ljust(self._drawn) + end)
+        self.stream.flush()
+        self._drawn = len(text)
+
+    def close(self) -> None:
+        self._draw("\n")
+
+    def wrap(self, items: Iterable[T]) -> Iterator[T]:
+        """Yield *items*, updating the display and :data:`METRICS` for each."""
+        try:
+            for item in items:
+                self.metrics.tick()
+                self.update()
+                yield item
+        finally:
+            self.close()
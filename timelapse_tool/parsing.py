@@ -6,6 +6,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Pattern
 
+FIXED_FORMAT = "%Y%m%d%H%M%S"
+
 
 @dataclass
 class ParseResult:
@@ -33,6 +35,17 @@ def parse_timestamp(name: str, pattern: Pattern[str], ts_format: str) -> ParseRe
         return ParseResult(timestamp=None, matched=False)
     ts_str = match.group(1)
     try:
+        if ts_format == FIXED_FORMAT and len(ts_str) == 14 and ts_str.isascii():
+            # avoid the comparatively slow strptime for the camera default
+            return ParseResult(_parse_fixed(ts_str), matched=True)
         return ParseResult(datetime.strptime(ts_str, ts_format), matched=True)
     except ValueError:
         return ParseResult(timestamp=None, matched=True)
+
+
+def _parse_fixed(s: str) -> datetime:
+    if not s.isdigit():
+        raise ValueError(f"invalid timestamp {s!r}")
+    return datetime(
+        int(s[0:4]), int(s[4:6]), int(s[6:8]), int(s[8:10]), int(s[10:12]), int(s[12:14])
+    )
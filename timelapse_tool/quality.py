@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+"""Cheap per-frame image quality metrics."""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# longest side, in pixels, that quality statistics are computed on
+ANALYSIS_SIDE = 320
+# side of the difference hash grid (HASH_SIDE * HASH_SIDE bits)
+HASH_SIDE = 8
+
+# (scale factor, imread flag) from the most to the least reduced decode
+_REDUCED_MODES = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+@dataclass(slots=True)
+class FrameQuality:
+    """Statistics of one frame, computed on a reduced copy of it."""
+
+    brightness: float
+    contrast: float
+    sharpness: float
+    dhash: int
+
+    def is_flat(self, flat_threshold: float) -> bool:
+        """Return ``True`` for a featureless, black or blown-out frame."""
+        return _flat(self.brightness, self.contrast, flat_threshold)
+
+
+def _flat(brightness: float, contrast: float, flat_threshold: float) -> bool:
+    return contrast < flat_threshold or brightness < 5 or brightness > 250
+
+
+def frame_is_flat(frame: np.ndarray, flat_threshold: float) -> bool:
+    """Return ``True`` for a featureless, black or blown-out decoded frame."""
+    mean, std = cv2.meanStdDev(frame)
+    return _flat(float(mean.mean()), float(std.mean()), flat_threshold)
+
+
+def reduced_read_flag(
+    source: Tuple[Optional[int], Optional[int]], size: Tuple[int, int]
+) -> int:
+    """Return the cheapest ``cv2.imread`` flag that still covers *size*.
+
+    JPEG decoders can scale by 1/2, 1/4 or 1/8 while decoding, which is much
+    cheaper than decoding the full frame and resizing it.  The largest factor
+    keeping the decoded frame at least as big as *size* is chosen, so quality
+    is unchanged after the final resize.
+    """
+    src_w, src_h = source
+    if not src_w or not src_h:
+        return cv2.IMREAD_COLOR
+    for factor, flag in _REDUCED_MODES:
+        if src_w // factor >= size[0] and src_h // factor >= size[1]:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def read_for_analysis(
+    path: Path, width: Optional[int], height: Optional[int]
+) -> Optional[np.ndarray]:
+    """Decode *path* at the smallest scale still suitable for analysis."""
+    target = (1, 1)
+    if width and height:
+        scale = ANALYSIS_SIDE / max(width, height)
+        target = (max(1, int(width * scale)), max(1, int(height * scale)))
+    frame = cv2.imread(str(path), reduced_read_flag((width, height), target))
+    if frame is None or frame.size == 0:
+        return None
+    return frame
+
+
+def measure(frame: np.ndarray) -> FrameQuality:
+    """Compute :class:`FrameQuality` for a decoded BGR *frame*.
+
+    Frames larger than :data:`ANALYSIS_SIDE` are sampled on a strided grid,
+    so the cost per frame is bounded whatever the sensor resolution.
+    """
+    stride = max(1, max(frame.shape[:2]) // ANALYSIS_SIDE)
+    if stride > 1:
+        frame = frame[::stride, ::stride]
+    mean, std = cv2.meanStdDev(frame)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    return FrameQuality(
+        brightness=float(mean.mean()),
+        contrast=float(std.mean()),
+        sharpness=sharpness,
+        dhash=dhash(gray),
+    )
+
+
+def dhash(gray: np.ndarray) -> int:
+    """Return the 64-bit difference hash of a grayscale image."""
+    small = cv2.resize(gray, (HASH_SIDE + 1, HASH_SIDE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a: int, b: int) -> int:
+    """Return the number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
@@ -4,87 +4,271 @@ from __future__ import annotations
 
 import csv
 import json
+import tempfile
+import zipfile
 from pathlib import Path
-from typing import Iterable
+from typing import IO, TYPE_CHECKING, BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from .gaps import Gap
 from .validate import ImageValidationResult
 
+if TYPE_CHECKING:
+    import numpy as np
 
-def write_image_report(results: Iterable[ImageValidationResult], path: Path) -> None:
-    """Write per-image validation info to ``path`` (CSV or JSON)."""
-    path.parent.mkdir(parents=True, exist_ok=True)
-    if path.suffix.lower() == ".json":
-        data = [
-            {
-                "filename": r.path.name,
-                "timestamp": r.timestamp.isoformat() if r.timestamp else None,
-                "size_bytes": r.size_bytes,
-                "readable": r.readable,
-                "width": r.width,
-                "height": r.height,
-                "reasons": r.reasons,
-                "is_flat": r.is_flat,
-            }
-            for r in results
-        ]
-        path.write_text(json.dumps(data, indent=2))
-    else:
-        with path.open("w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "filename",
-                "timestamp",
-                "size_bytes",
-                "readable",
-                "width",
-                "height",
-                "reasons",
-                "is_flat",
-            ])
-            for r in results:
-                writer.writerow([
-                    r.path.name,
-                    r.timestamp.isoformat() if r.timestamp else "",
-                    r.size_bytes,
-                    r.readable,
-                    r.width or "",
-                    r.height or "",
-                    ";".join(r.reasons),
-                    r.is_flat,
-                ])
-
-
-def write_gap_report(gaps: Iterable[Gap], path: Path) -> None:
-    """Write gap information to ``path`` (CSV or JSON)."""
+# report format, chosen from the file suffix (anything else is CSV)
+REPORT_FORMATS = ("csv", "json", "jsonl", "npz")
+
+# (column, numpy dtype used by the columnar format)
+Columns = Sequence[Tuple[str, str]]
+
+IMAGE_COLUMNS: Columns = (
+    ("filename", "U"),
+    ("timestamp", "datetime64[s]"),
+    ("size_bytes", "int64"),
+    ("readable", "bool"),
+    ("width", "int32"),
+    ("height", "int32"),
+    ("reasons", "U"),
+    ("is_flat", "bool"),
+    ("brightness", "float32"),
+    ("sharpness", "float32"),
+    ("dhash", "U16"),
+)
+
+GAP_COLUMNS: Columns = (
+    ("prev_file", "U"),
+    ("prev_ts", "datetime64[s]"),
+    ("next_file", "U"),
+    ("next_ts", "datetime64[s]"),
+    ("gap_minutes", "float64"),
+    ("kind", "U"),
+)
+
+# quality statistics written to CSV with two decimals; other values use str()
+_CSV_ROUNDED = frozenset({"brightness", "sharpness"})
+
+# rows buffered per column before they are packed into a numpy array
+_NPZ_CHUNK = 65536
+
+# (dtype, rows, offset in the spool file) of a packed npz chunk
+_Chunk = Tuple["np.dtype", int, int]
+
+
+def report_format(path: Path) -> str:
+    """Return the report format implied by the suffix of *path*."""
+    suffix = path.suffix.lower().lstrip(".")
+    return suffix if suffix in REPORT_FORMATS else "csv"
+
+
+def _format_hash(value: Optional[int]) -> Optional[str]:
+    return None if value is None else f"{value:016x}"
+
+
+def _csv_value(value: object, rounded: bool = False) -> object:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ";".join(value)
+    if rounded:
+        return f"{value:.2f}"
+    return value
+
+
+def _npz_value(value: object, dtype: str) -> object:
+    if isinstance(value, (list, tuple)):
+        return ";".join(value)
+    if value is not None:
+        return value
+    if dtype.startswith("U"):
+        return ""
+    if dtype.startswith("datetime64"):
+        return "NaT"
+    if dtype.startswith("float"):
+        return float("nan")
+    return 0
+
+
+class ReportWriter:
+    """Write report rows to *path* one at a time.
+
+    CSV, JSON and JSON Lines rows go straight to the file, so memory does
+    not grow with the number of rows.  The ``npz`` format stores one numpy
+    array per column; rows are packed into typed arrays every
+    ``_NPZ_CHUNK`` rows and spooled to a temporary file.  On :meth:`close`
+    each column is copied chunk by chunk into its own ``.npy`` member of
+    the archive, so memory stays bounded by one chunk there too.
+
+    The file is only created with the first row (or on :meth:`close`).  A
+    scan lists a folder before yielding its first result, so a report
+    written into the scanned folder is never picked up as a frame.
+    """
+
+    def __init__(self, path: Path, columns: Columns) -> None:
+        self.path = path
+        self.columns = columns
+        self.format = report_format(path)
+        self.rows = 0
+        self._file: Optional[IO[str]] = None
+        self._closed = False
+        self._chunks: Dict[str, List[_Chunk]] = {name: [] for name, _ in columns}
+        self._pending: Dict[str, list] = {name: [] for name, _ in columns}
+        self._spool: Optional[BinaryIO] = None
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("w", newline="")
+        if self.format == "csv":
+            self._csv = csv.writer(self._file)
+            self._csv.writerow([name for name, _ in self.columns])
+        elif self.format == "json":
+            self._file.write("[")
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def write(self, row: Dict[str, object]) -> None:
+        if self._file is None and self.format != "npz":
+            self._open()
+        if self.format == "csv":
+            self._csv.writerow(
+                [_csv_value(row[name], name in _CSV_ROUNDED) for name, _ in self.columns]
+            )
+        elif self.format == "npz":
+            for name, dtype in self.columns:
+                self._pending[name].append(_npz_value(row[name], dtype))
+            if len(self._pending[self.columns[0][0]]) >= _NPZ_CHUNK:
+                self._pack()
+        elif self.format == "json":
+            sep = ",\n  " if self.rows else "\n  "
+            self._file.write(sep + json.dumps(row))  # type: ignore[union-attr]
+        else:
+            self._file.write(json.dumps(row) + "\n")  # type: ignore[union-attr]
+        self.rows += 1
+
+    def _pack(self) -> None:
+        # only the columnar format needs NumPy
+        import numpy as np
+
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile()
+        for name, dtype in self.columns:
+            values = self._pending[name]
+            if values:
+                array = np.array(values, dtype=dtype)
+                self._chunks[name].append((array.dtype, len(array), self._spool.tell()))
+                self._spool.write(array.tobytes())
+            self._pending[name] = []
+
+    def _write_column(self, archive: zipfile.ZipFile, name: str, dtype: str) -> None:
+        import numpy as np
+
+        chunks = self._chunks.pop(name)
+        # string widths differ between chunks; the column takes the widest
+        full = max(
+            (d for d, _, _ in chunks),
+            key=lambda d: d.itemsize,
+            default=np.array([], dtype=dtype).dtype,
+        )
+        header = {
+            "descr": np.lib.format.dtype_to_descr(full),
+            "fortran_order": False,
+            "shape": (sum(n for _, n, _ in chunks),),
+        }
+        spool = self._spool
+        assert spool is not None
+        with archive.open(name + ".npy", "w", force_zip64=True) as out:
+            np.lib.format.write_array_header_1_0(out, header)
+            for d, n, offset in chunks:
+                spool.seek(offset)
+                data = np.frombuffer(spool.read(n * d.itemsize), dtype=d)
+                out.write(data.astype(full, copy=False).tobytes())
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self.format == "npz":
+            self._pack()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for name, dtype in self.columns:
+                    self._write_column(archive, name, dtype)
+            self._spool.close()  # type: ignore[union-attr]
+            self._spool = None
+            return
+        if self._file is None:
+            self._open()
+        if self.format == "json":
+            self._file.write("\n]\n" if self.rows else "]\n")
+        self._file.close()
+        self._file = None
+
+
+def _image_row(r: ImageValidationResult) -> Dict[str, object]:
+    return {
+        "filename": r.path.name,
+        "timestamp": r.timestamp.isoformat() if r.timestamp else None,
+        "size_bytes": r.size_bytes,
+        "readable": r.readable,
+        "width": r.width,
+        "height": r.height,
+        "reasons": r.reasons,
+        "is_flat": r.is_flat,
+        "brightness": r.brightness,
+        "sharpness": r.sharpness,
+        "dhash": _format_hash(r.dhash),
+    }
+
+
+def _gap_row(g: Gap) -> Dict[str, object]:
+    return {
+        "prev_file": g.prev_file.name,
+        "prev_ts": g.prev_ts.isoformat(),
+        "next_file": g.next_file.name,
+        "next_ts": g.next_ts.isoformat(),
+        "gap_minutes": g.gap_minutes,
+        "kind": g.kind,
+    }
+
+
+def write_image_report(results: Iterable[ImageValidationResult], path: Path) -> int:
+    """Stream per-image validation info to ``path``; return the row count.
+
+    The format follows the suffix: ``.json``, ``.jsonl``, ``.npz`` or CSV.
+    """
+    with ReportWriter(path, IMAGE_COLUMNS) as writer:
+        for r in results:
+            writer.write(_image_row(r))
+    return writer.rows
+
+
+def write_gap_report(gaps: Iterable[Gap], path: Path) -> int:
+    """Stream gap information to ``path``; return the row count."""
+    with ReportWriter(path, GAP_COLUMNS) as writer:
+        for g in gaps:
+            writer.write(_gap_row(g))
+    return writer.rows
+
+
+def load_columns(path: Path) -> Dict[str, np.ndarray]:
+    """Load an ``npz`` report as one array per column."""
+    import numpy as np
+
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def write_exit_report(summary: Dict[str, int], gaps: List[Gap], code: int, path: Path) -> None:
+    """Write the structured outcome of a dataset test to ``path`` as JSON."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    if path.suffix.lower() == ".json":
-        data = [
-            {
-                "prev_file": g.prev_file.name,
-                "prev_ts": g.prev_ts.isoformat(),
-                "next_file": g.next_file.name,
-                "next_ts": g.next_ts.isoformat(),
-                "gap_minutes": g.gap_minutes,
-            }
-            for g in gaps
-        ]
-        path.write_text(json.dumps(data, indent=2))
-    else:
-        with path.open("w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "prev_file",
-                "prev_ts",
-                "next_file",
-                "next_ts",
-                "gap_minutes",
-            ])
-            for g in gaps:
-                writer.writerow([
-                    g.prev_file.name,
-                    g.prev_ts.isoformat(),
-                    g.next_file.name,
-                    g.next_ts.isoformat(),
-                    g.gap_minutes,
-                ])
+    data = {
+        "status": "fail" if code else "ok",
+        "exit_code": code,
+        "summary": summary,
+        "gaps": len(gaps),
+        "largest_gap_minutes": max((g.gap_minutes for g in gaps), default=0.0),
+    }
+    path.write_text(json.dumps(data, indent=2))
@@ -3,33 +3,126 @@ from __future__ import annotations
 """Frame sampling logic."""
 
 from datetime import datetime
-from typing import Iterable, List, Optional
+from typing import Iterable, Iterator, List, Optional
 
+import numpy as np
+
+from .defaults import SAMPLE_MODES  # noqa: F401 (re-exported)
+from .timeindex import timestamps_of
 from .validate import ImageValidationResult
 
 
-def sample_images(
+def iter_sample_images(
     images: Iterable[ImageValidationResult], sample_minutes: Optional[int]
-) -> List[ImageValidationResult]:
-    """Return a subset of *images* spaced by at least ``sample_minutes``.
+) -> Iterator[ImageValidationResult]:
+    """Lazily yield the images of *images* spaced by at least ``sample_minutes``.
 
-    If ``sample_minutes`` is ``None`` or ``0`` the original list is returned.
+    If ``sample_minutes`` is ``None`` or ``0`` every image is yielded.
     Images must be sorted by timestamp.
     """
-    images = list(images)
     if not sample_minutes:
-        return images
-    sampled: List[ImageValidationResult] = []
+        yield from images
+        return
     last_ts: Optional[datetime] = None
     for img in images:
         if img.timestamp is None:
             continue
         if last_ts is None:
-            sampled.append(img)
+            yield img
             last_ts = img.timestamp
             continue
         delta = (img.timestamp - last_ts).total_seconds() / 60.0
         if delta >= sample_minutes:
-            sampled.append(img)
+            yield img
             last_ts = img.timestamp
-    return sampled
+
+
+def sample_images(
+    images: Iterable[ImageValidationResult], sample_minutes: Optional[int]
+) -> List[ImageValidationResult]:
+    """Return a subset of *images* spaced by at least ``sample_minutes``.
+
+    If ``sample_minutes`` is ``None`` or ``0`` the original list is returned.
+    Images must be sorted by timestamp.
+    """
+    return list(iter_sample_images(images, sample_minutes))
+
+
+def _nearest(ts: np.ndarray, slots: np.ndarray) -> np.ndarray:
+    """Index of the entry of sorted *ts* closest to each of *slots*."""
+    right = np.clip(np.searchsorted(ts, slots), 0, len(ts) - 1)
+    left = np.clip(right - 1, 0, len(ts) - 1)
+    closer_left = np.abs(slots - ts[left]) <= np.abs(ts[right] - slots)
+    return np.where(closer_left, left, right)
+
+
+def _pick(
+    imgs: List[ImageValidationResult],
+    ts: np.ndarray,
+    slots: np.ndarray,
+    tolerance: np.timedelta64,
+    fill_gaps: bool,
+) -> List[ImageValidationResult]:
+    idx = _nearest(ts, slots)
+    hit = np.abs(ts[idx] - slots) <= tolerance
+    if fill_gaps:
+        # slots without a nearby frame repeat the last frame shown
+        last_hit = np.maximum.accumulate(np.where(hit, np.arange(len(idx)), 0))
+        idx = idx[last_hit]
+        return [imgs[i] for i in idx]
+    idx = idx[hit]
+    # sparse data can map neighbouring slots to the same frame
+    keep = np.ones(len(idx), dtype=bool)
+    keep[1:] = idx[1:] != idx[:-1]
+    return [imgs[i] for i in idx[keep]]
+
+
+def _timed(images: Iterable[ImageValidationResult]) -> List[ImageValidationResult]:
+    return [img for img in images if img.timestamp is not None]
+
+
+def grid_sample(
+    images: Iterable[ImageValidationResult], interval_minutes: float, fill_gaps: bool = False
+) -> List[ImageValidationResult]:
+    """Pick the frame nearest to each slot of a fixed wall-clock grid.
+
+    Slots are ``interval_minutes`` apart starting at the first frame.  A slot
+    is only filled by a frame within half an interval of it; with
+    ``fill_gaps`` empty slots repeat the previous frame instead, so playback
+    speed stays constant across camera outages.  Images must be sorted by
+    timestamp.
+    """
+    imgs = _timed(images)
+    if not imgs or interval_minutes <= 0:
+        return imgs
+    ts = timestamps_of(imgs)
+    step = np.timedelta64(round(interval_minutes * 60), "s")
+    n_slots = int((ts[-1] - ts[0]) // step) + 1
+    slots = ts[0] + step * np.arange(n_slots)
+    return _pick(imgs, ts, slots, step // 2, fill_gaps)
+
+
+def count_sample(
+    images: Iterable[ImageValidationResult], count: int, fill_gaps: bool = False
+) -> List[ImageValidationResult]:
+    """Pick ``count`` frames evenly spread over the time span of *images*.
+
+    Exactly ``count`` frames are returned, giving a predictable output
+    duration; frames are repeated when there are fewer than ``count``.  Each
+    slot shows the frame nearest to it, so the frames either side of a gap
+    share its slots; with ``fill_gaps`` slots far from any frame repeat the
+    previous frame instead.  Images must be sorted by timestamp.
+    """
+    imgs = _timed(images)
+    if not imgs or count <= 0:
+        return []
+    ts = timestamps_of(imgs)
+    if count == 1 or ts[-1] == ts[0]:
+        return imgs[:1] * count
+    span = (ts[-1] - ts[0]).astype(np.int64)
+    offsets = np.round(np.linspace(0, span, count)).astype(np.int64)
+    slots = ts[0] + offsets.astype("timedelta64[s]")
+    if not fill_gaps:
+        return [imgs[i] for i in _nearest(ts, slots)]
+    tolerance = np.timedelta64(int(span / (count - 1) / 2), "s")
+    return _pick(imgs, ts, slots, tolerance, fill_gaps)
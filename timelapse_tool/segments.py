@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+"""Segmented, resumable and parallel video encoding."""
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import shutil
+import subprocess
+import tempfile
+
+import cv2
+
+from .validate import ImageValidationResult, iter_chunks, resolve_workers
+from .video import BuildReport, build_video
+
+MANIFEST_NAME = "manifest.json"
+
+
+def segment_dir(output: Path) -> Path:
+    """Return the folder holding the segments of *output*."""
+    return output.with_name(output.name + ".segments")
+
+
+def _digest(images: List[ImageValidationResult], settings: Dict[str, object]) -> str:
+    h = hashlib.sha1(json.dumps(settings, sort_keys=True).encode())
+    for img in images:
+        h.update(f"{img.path}\0{img.size_bytes}\n".encode())
+    return h.hexdigest()
+
+
+class Manifest:
+    """Record of the segments already encoded for one output."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.segments: Dict[str, Dict[str, object]] = {}
+        if path.exists():
+            self.segments = json.loads(path.read_text()).get("segments", {})
+
+    def is_done(self, index: int, digest: str, file: Path) -> bool:
+        entry = self.segments.get(str(index))
+        return entry is not None and entry["digest"] == digest and file.exists()
+
+    def mark_done(self, index: int, digest: str, file: Path, report: BuildReport) -> None:
+        self.segments[str(index)] = {"digest": digest, "file": file.name, **asdict(report)}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"segments": self.segments}, indent=2))
+        tmp.replace(self.path)
+
+
+def concat_segments(segments: List[Path], output: Path, fps: int, codec: str) -> None:
+    """Join *segments* into *output*.
+
+    With ``ffmpeg`` on ``PATH`` the segments are concatenated losslessly
+    (stream copy).  Otherwise the frames are re-encoded with OpenCV, which is
+    slower and not lossless, and a warning is logged.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is not None:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            for seg in segments:
+                f.write(f"file '{seg.resolve().as_posix()}'\n")
+            listing = Path(f.name)
+        try:
+            cmd = [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0"]
+            cmd += ["-i", str(listing), "-c", "copy", str(output)]
+            subprocess.run(cmd, check=True)
+        finally:
+            listing.unlink()
+        return
+
+    logging.warning("ffmpeg not found: re-encoding segments with OpenCV")
+    writer = None
+    try:
+        for seg in segments:
+            cap = cv2.VideoCapture(str(seg))
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                if writer is None:
+                    size = (frame.shape[1], frame.shape[0])
+                    writer = cv2.VideoWriter(
+                        str(output), cv2.VideoWriter_fourcc(*codec), fps, size
+                    )
+                writer.write(frame)
+            cap.release()
+    finally:
+        if writer is not None:
+            writer.release()
+
+
+def build_segmented(
+    images: Iterable[ImageValidationResult],
+    output: Path,
+    fps: int,
+    codec: str,
+    segment_frames: int,
+    size: Optional[Tuple[int, int]] = None,
+    strict: bool = False,
+    workers: Optional[int] = 0,
+    flat_threshold: Optional[float] = None,
+) -> BuildReport:
+    """Encode *images* as fixed-length segments in parallel, then join them.
+
+    The frames are split into chunks of ``segment_frames`` that are encoded
+    by a pool of worker processes (``0`` means one per core).  Completed
+    segments are recorded in a manifest next to the output, so a rerun after
+    a crash only encodes the segments that are missing or whose input
+    frames changed.
+    """
+    valid = (img for img in images if img.is_valid)
+    folder = segment_dir(output)
+    folder.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(folder / MANIFEST_NAME)
+    report = BuildReport(frames_written=0, skipped=0)
+    segments: List[Path] = []
+    n = resolve_workers(workers)
+
+    def collect(index: int, digest: str, file: Path, fut: Future) -> None:
+        part: BuildReport = fut.result()
+        manifest.mark_done(index, digest, file, part)
+        _merge(report, part)
+
+    with ProcessPoolExecutor(max_workers=n) as pool:
+        window: Deque[Tuple[int, str, Path, Future]] = deque()
+        for index, chunk in enumerate(iter_chunks(valid, segment_frames)):
+            if size is None:
+                first = chunk[0]
+                if first.width and first.height:
+                    size = (first.width, first.height)
+                else:
+                    frame = cv2.imread(str(first.path))
+                    if frame is None:
+                        raise ValueError("cannot read first image")
+                    size = (frame.shape[1], frame.shape[0])
+            settings = {
+                "fps": fps,
+                "codec": codec,
+                "size": list(size),
+                "strict": strict,
+                "flat_threshold": flat_threshold,
+            }
+            digest = _digest(chunk, settings)
+            file = folder / f"segment_{index:05d}{output.suffix}"
+            segments.append(file)
+            if manifest.is_done(index, digest, file):
+                _merge(report, BuildReport(**_report_fields(manifest.segments[str(index)])))
+                continue
+            fut = pool.submit(
+                build_video,
+                chunk,
+                file,
+                fps,
+                codec,
+                size=size,
+                strict=strict,
+                flat_threshold=flat_threshold,
+            )
+            window.append((index, digest, file, fut))
+            if len(window) >= n * 2:
+                collect(*window.popleft())
+        while window:
+            collect(*window.popleft())
+
+    if not segments:
+        raise ValueError("no valid images to build video")
+    concat_segments(segments, output, fps, codec)
+    return report
+
+
+def _report_fields(entry: Dict[str, object]) -> Dict[str, object]:
+    return {k: v for k, v in entry.items() if k not in ("digest", "file")}
+
+
+def _merge(total: BuildReport, part: BuildReport) -> None:
+    total.frames_written += part.frames_written
+    total.skipped += part.skipped
+    total.flat += part.flat
+    total.stalls += part.stalls
+    total.decode_wait_seconds += part.decode_wait_seconds
+    total.encode_seconds += part.encode_seconds
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+"""Columnar timestamp handling on NumPy ``datetime64`` arrays."""
+
+from datetime import datetime, timedelta
+from typing import Sequence
+
+import numpy as np
+
+from .validate import ImageValidationResult
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+def timestamps_of(images: Sequence[ImageValidationResult]) -> np.ndarray:
+    """Return the timestamps of *images* as a ``datetime64[s]`` array.
+
+    Every image must have a timestamp.  The epoch seconds are computed in
+    Python and converted in one step: NumPy converts ``datetime`` objects
+    one at a time through a generic path that is several times slower.
+    """
+    seconds = np.fromiter(
+        [(img.timestamp - _EPOCH) // _SECOND for img in images],  # type: ignore[operator]
+        dtype=np.int64,
+        count=len(images),
+    )
+    return seconds.astype("datetime64[s]")
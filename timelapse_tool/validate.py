@@ -2,20 +2,56 @@ from __future__ import annotations
 
 """Image validation utilities."""
 
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional, Pattern
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+    TypeVar,
+)
+import os
+import sys
 
-import cv2
-
-from .io_utils import iter_files
+from .io_utils import FileEntry, iter_entries
+from .jpeg import is_jpeg, read_jpeg_header
+from .metrics import timed
 from .parsing import parse_timestamp
 
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import ValidationCache
+
+
+# shared reason tuples: a result only stores a pointer to one of a handful
+_REASONS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
 
-@dataclass
+def intern_reasons(reasons: Iterable[str]) -> Tuple[str, ...]:
+    """Return the canonical shared tuple for *reasons*."""
+    key = tuple(sys.intern(r) for r in reasons)
+    return _REASONS.setdefault(key, key)
+
+
+@dataclass(slots=True)
 class ImageValidationResult:
-    """Information about a validated image file."""
+    """Information about a validated image file.
+
+    Instances use ``__slots__`` and share their ``reasons`` tuple with every
+    other result failing for the same reasons, keeping large scans compact.
+    """
 
     path: Path
     timestamp: Optional[datetime]
@@ -23,8 +59,14 @@ class ImageValidationResult:
     readable: bool
     width: Optional[int]
     height: Optional[int]
-    reasons: List[str]
+    reasons: Tuple[str, ...]
     is_flat: bool = False
+    brightness: Optional[float] = None
+    sharpness: Optional[float] = None
+    dhash: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        self.reasons = intern_reasons(self.reasons)
 
     @property
     def is_valid(self) -> bool:
@@ -37,40 +79,97 @@ def validate_image(
     ts_format: str,
     min_bytes: int,
     flat_threshold: Optional[float] = None,
+    deep: bool = False,
+    size_bytes: Optional[int] = None,
+    quality: bool = False,
+    min_brightness: Optional[float] = None,
+    min_sharpness: Optional[float] = None,
+    names_only: bool = False,
 ) -> ImageValidationResult:
-    """Validate a single image file."""
+    """Validate a single image file.
+
+    By default JPEG files are only checked by parsing their header and EOI
+    trailer, which yields the dimensions and detects truncation without
+    decoding pixels.  The image is fully decoded when ``deep`` is set or when
+    the file is not a JPEG.  ``size_bytes`` may be passed when the caller
+    already stat-ed the file.
+
+    Pixel statistics (``quality``, ``flat_threshold``, ``min_brightness`` and
+    ``min_sharpness``) are computed on a reduced-resolution decode, so their
+    cost does not grow with the sensor resolution.  Frames darker or blurrier
+    than the given minimums are rejected as ``"dark"`` or ``"blurry"``.
+
+    With ``names_only`` the file is never opened: only the name and size are
+    checked and the image is assumed readable.  OpenCV is imported on first
+    use, so header checks and name-only scans never load it.
+    """
     reasons: List[str] = []
-    result = parse_timestamp(path.name, pattern, ts_format)
+    with timed("parse"):
+        result = parse_timestamp(path.name, pattern, ts_format)
     timestamp = result.timestamp
     if not result.matched:
         reasons.append("pattern")
     elif timestamp is None:
         reasons.append("timestamp")
 
-    try:
-        size_bytes = path.stat().st_size
-    except OSError:
-        size_bytes = 0
+    if size_bytes is None:
+        try:
+            size_bytes = path.stat().st_size
+        except OSError:
+            size_bytes = 0
     if size_bytes < min_bytes:
         reasons.append("size")
 
     readable = False
     width = height = None
-    is_flat = False
     frame = None
-    if size_bytes >= min_bytes:
-        frame = cv2.imread(str(path))
-        if frame is None or frame.size == 0:
+    if size_bytes >= min_bytes and names_only:
+        readable = True
+    elif size_bytes >= min_bytes:
+        with timed("header"):
+            header = None if deep else read_jpeg_header(path)
+        if header is not None:
+            width, height = header.width, header.height
+            if header.truncated:
+                reasons.append("truncated")
+            else:
+                readable = True
+        elif not deep and is_jpeg(path):
             reasons.append("unreadable")
         else:
-            readable = True
-            height, width = frame.shape[:2]
+            import cv2
+
+            with timed("decode"):
+                frame = cv2.imread(str(path))
+            if frame is None or frame.size == 0:
+                reasons.append("unreadable")
+            else:
+                readable = True
+                height, width = frame.shape[:2]
+
+    is_flat = False
+    stats = None
+    analyse = quality or any(
+        v is not None for v in (flat_threshold, min_brightness, min_sharpness)
+    )
+    if readable and analyse and not names_only:
+        from .quality import measure, read_for_analysis
+
+        if frame is None:
+            with timed("decode"):
+                frame = read_for_analysis(path, width, height)
+        if frame is None:
+            readable = False
+            reasons.append("unreadable")
+        else:
+            with timed("analysis"):
+                stats = measure(frame)
             if flat_threshold is not None:
-                mean, std = cv2.meanStdDev(frame)
-                mean_v = float(mean.mean())
-                std_v = float(std.mean())
-                if std_v < flat_threshold or mean_v < 5 or mean_v > 250:
-                    is_flat = True
+                is_flat = stats.is_flat(flat_threshold)
+            if min_brightness is not None and stats.brightness < min_brightness:
+                reasons.append("dark")
+            if min_sharpness is not None and stats.sharpness < min_sharpness:
+                reasons.append("blurry")
     return ImageValidationResult(
         path=path,
         timestamp=timestamp,
@@ -80,7 +179,172 @@ def validate_image(
         height=height,
         reasons=reasons,
         is_flat=is_flat,
+        brightness=stats.brightness if stats else None,
+        sharpness=stats.sharpness if stats else None,
+        dhash=stats.dhash if stats else None,
+    )
+
+
+EXECUTORS = ("thread", "process")
+# files handed to a process worker per task
+_PROCESS_CHUNK = 16
+# tasks kept in flight per worker while streaming results
+_WINDOW_PER_WORKER = 4
+# cache entries buffered before they are written to disk
+_CACHE_FLUSH = 1000
+
+T = TypeVar("T")
+# a listed file and its cached result, if any
+_Entry = Tuple[FileEntry, Optional[ImageValidationResult]]
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """Return the effective worker count; ``0`` or ``None`` means all cores."""
+    if not workers:
+        return os.cpu_count() or 1
+    if workers < 0:
+        raise ValueError("workers must be >= 0")
+    return workers
+
+
+def _make_executor(kind: str, workers: int) -> Executor:
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError(f"unknown executor {kind!r}, expected one of {EXECUTORS}")
+
+
+def _validate_chunk(
+    check: Callable[..., ImageValidationResult], entries: List[FileEntry]
+) -> List[ImageValidationResult]:
+    return [check(e.path, size_bytes=e.size) for e in entries]
+
+
+def iter_chunks(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield consecutive lists of up to *size* items from *items*."""
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_scan_folder(
+    folder: Path,
+    pattern: Pattern[str],
+    ts_format: str,
+    min_bytes: int,
+    flat_threshold: Optional[float] = None,
+    deep: bool = False,
+    workers: Optional[int] = 1,
+    executor: str = "thread",
+    cache: Optional["ValidationCache"] = None,
+    recursive: bool = False,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    quality: bool = False,
+    min_brightness: Optional[float] = None,
+    min_sharpness: Optional[float] = None,
+    pool: Optional[Executor] = None,
+    names_only: bool = False,
+) -> Iterator[ImageValidationResult]:
+    """Lazily validate the files of *folder* in :func:`iter_entries` order.
+
+    With ``workers`` greater than one the files are validated on a pool of
+    threads or processes (``executor``); ``0`` uses one worker per core.
+    OpenCV releases the GIL while decoding, so threads usually scale as well
+    as processes without the pickling overhead.  Only a bounded window of
+    files is in flight at any time, so memory does not grow with the folder.
+    ``recursive`` also scans ``YYYY/MM/DD`` style sub-folders.  ``start`` and
+    ``end`` restrict the scan to files whose name carries a timestamp in that
+    range; other files are never stat-ed or decoded.  The quality options
+    and ``names_only`` are passed on to :func:`validate_image`.
+
+    An existing *pool* may be shared between scans (see
+    :mod:`~timelapse_tool.batch`); it is used instead of creating one and is
+    left running.  Each scan still keeps at most ``workers`` times a small
+    factor of files in flight, so concurrent scans take turns in its queue.
+
+    When a :class:`~timelapse_tool.cache.ValidationCache` is given, files
+    whose size and mtime are unchanged are taken from it and only new or
+    modified files are validated.  The stat fields come from the directory
+    listing, so no file is stat-ed twice.
+    """
+    files: Iterable[FileEntry] = iter_entries(
+        folder, recursive, pattern, ts_format, start=start, end=end
+    )
+    if cache is not None:
+        # keep the database (and its journal) out of the scanned dataset
+        db = cache.path.resolve()
+        files = (
+            e for e in files
+            if not (e.path.name.startswith(db.name) and e.path.parent.resolve() == db.parent)
+        )
+    check = partial(
+        validate_image,
+        pattern=pattern,
+        ts_format=ts_format,
+        min_bytes=min_bytes,
+        flat_threshold=flat_threshold,
+        deep=deep,
+        quality=quality,
+        min_brightness=min_brightness,
+        min_sharpness=min_sharpness,
+        names_only=names_only,
     )
+    n = resolve_workers(workers)
+    # larger chunks amortise the IPC round trip for process pools
+    chunk_size = _PROCESS_CHUNK if executor == "process" and n > 1 else 1
+    pending: List[Tuple[ImageValidationResult, FileEntry]] = []
+
+    def lookup(chunk: List[FileEntry]) -> List[_Entry]:
+        if cache is None:
+            return [(e, None) for e in chunk]
+        return [(e, cache.get(e)) for e in chunk]
+
+    def complete(
+        entries: List[_Entry], fresh: List[ImageValidationResult]
+    ) -> List[ImageValidationResult]:
+        fresh_it = iter(fresh)
+        results = []
+        for entry, hit in entries:
+            if hit is None:
+                hit = next(fresh_it)
+                # results unpickled from worker processes carry private copies
+                hit.reasons = intern_reasons(hit.reasons)
+                if cache is not None:
+                    pending.append((hit, entry))
+            results.append(hit)
+        if cache is not None and len(pending) >= _CACHE_FLUSH:
+            cache.put_many(pending)
+            pending.clear()
+        return results
+
+    def todo(entries: List[_Entry]) -> List[FileEntry]:
+        return [e for e, hit in entries if hit is None]
+
+    try:
+        if n <= 1 and pool is None:
+            for chunk in iter_chunks(files, chunk_size):
+                entries = lookup(chunk)
+                yield from complete(entries, _validate_chunk(check, todo(entries)))
+            return
+        with nullcontext(pool) if pool is not None else _make_executor(executor, n) as pool:
+            window: Deque[Tuple[List[_Entry], Future]] = deque()
+            for chunk in iter_chunks(files, chunk_size):
+                entries = lookup(chunk)
+                window.append((entries, pool.submit(_validate_chunk, check, todo(entries))))
+                if len(window) >= n * _WINDOW_PER_WORKER:
+                    entries, fut = window.popleft()
+                    yield from complete(entries, fut.result())
+            while window:
+                entries, fut = window.popleft()
+                yield from complete(entries, fut.result())
+    finally:
+        if cache is not None and pending:
+            cache.put_many(pending)
 
 
 def scan_folder(
@@ -89,9 +353,36 @@ def scan_folder(
     ts_format: str,
     min_bytes: int,
     flat_threshold: Optional[float] = None,
+    deep: bool = False,
+    workers: Optional[int] = 1,
+    executor: str = "thread",
+    cache: Optional["ValidationCache"] = None,
+    recursive: bool = False,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    quality: bool = False,
+    min_brightness: Optional[float] = None,
+    min_sharpness: Optional[float] = None,
+    names_only: bool = False,
 ) -> List[ImageValidationResult]:
-    """Validate all files in *folder*."""
-    return [
-        validate_image(p, pattern, ts_format, min_bytes, flat_threshold)
-        for p in iter_files(folder)
-    ]
+    """Validate all files in *folder*; see :func:`iter_scan_folder`."""
+    return list(
+        iter_scan_folder(
+            folder,
+            pattern,
+            ts_format,
+            min_bytes,
+            flat_threshold,
+            deep,
+            workers,
+            executor,
+            cache,
+            recursive,
+            start,
+            end,
+            quality,
+            min_brightness,
+            min_sharpness,
+            names_only=names_only,
+        )
+    )
@@ -2,19 +2,142 @@ from __future__ import annotations
 
 """Video writing utilities."""
 
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import nullcontext
 from dataclasses import dataclass
+from functools import partial
+from itertools import chain
 from pathlib import Path
-from typing import Iterable, Optional, Tuple
+from typing import TYPE_CHECKING, Deque, Iterable, Iterator, List, Optional, Sequence, Tuple
+import time
 
 import cv2
+import numpy as np
 
+from .deflicker import DEFAULT_MAX_GAIN, brightness_of, deflicker_gains, gain_lut
+from .metrics import METRICS, timed
+from .quality import frame_is_flat, reduced_read_flag
 from .validate import ImageValidationResult
 
+if TYPE_CHECKING:
+    from .framecache import FrameCache
+
+# frames queued per decode worker when no explicit depth is given
+DEFAULT_QUEUE_PER_WORKER = 4
+
 
 @dataclass
 class BuildReport:
     frames_written: int
     skipped: int
+    flat: int = 0
+    stalls: int = 0
+    decode_wait_seconds: float = 0.0
+    encode_seconds: float = 0.0
+
+    @property
+    def bottleneck(self) -> str:
+        """``"decode"`` if the encoder mostly waited for frames, else ``"encode"``."""
+        return "decode" if self.decode_wait_seconds > self.encode_seconds else "encode"
+
+
+def _load_frame(
+    img: ImageValidationResult, size: Tuple[int, int], cache: Optional["FrameCache"] = None
+) -> Optional[np.ndarray]:
+    if cache is not None:
+        cached = cache.get(img, size)
+        if cached is not None:
+            return cached
+    with timed("decode"):
+        frame = cv2.imread(str(img.path), reduced_read_flag((img.width, img.height), size))
+    if frame is None or frame.size == 0:
+        return None
+    if (frame.shape[1], frame.shape[0]) != size:
+        with timed("resize"):
+            frame = cv2.resize(frame, size)
+    if cache is not None:
+        cache.put(img, frame)
+    return frame
+
+
+def _iter_frames(
+    images: Iterable[ImageValidationResult],
+    size: Tuple[int, int],
+    workers: int,
+    queue_depth: Optional[int],
+    report: BuildReport,
+    pool: Optional[Executor] = None,
+    cache: Optional["FrameCache"] = None,
+) -> Iterator[Tuple[ImageValidationResult, Optional[np.ndarray]]]:
+    """Yield ``(image, frame)`` pairs in input order.
+
+    With ``workers`` decode threads, up to ``queue_depth`` frames are decoded
+    and resized ahead of the consumer.  Every time the consumer has to wait
+    for the head of the queue a stall is recorded in *report*.  A shared
+    *pool* replaces the private decode threads.  Frames found in *cache*
+    are not decoded, and decoded ones are added to it.
+    """
+    load = _load_frame if cache is None else partial(_load_frame, cache=cache)
+    if workers <= 0 and pool is None:
+        prev: Optional[ImageValidationResult] = None
+        frame: Optional[np.ndarray] = None
+        for img in images:
+            # gap filling repeats the same image, which is decoded only once
+            if img is not prev:
+                start = time.perf_counter()
+                frame = load(img, size)
+                report.decode_wait_seconds += time.perf_counter() - start
+                prev = img
+            yield img, frame
+        return
+
+    depth = max(1, queue_depth or max(1, workers) * DEFAULT_QUEUE_PER_WORKER)
+    queue: Deque[Tuple[ImageValidationResult, Future]] = deque()
+    with nullcontext(pool) if pool is not None else ThreadPoolExecutor(workers) as pool:
+
+        def pop() -> Tuple[ImageValidationResult, Optional[np.ndarray]]:
+            img, fut = queue.popleft()
+            if not fut.done():
+                report.stalls += 1
+            start = time.perf_counter()
+            frame = fut.result()
+            report.decode_wait_seconds += time.perf_counter() - start
+            return img, frame
+
+        for img in images:
+            if queue and queue[-1][0] is img:
+                queue.append(queue[-1])
+            else:
+                queue.append((img, pool.submit(load, img, size)))
+            if len(queue) >= depth:
+                yield pop()
+        while queue:
+            yield pop()
+
+
+@dataclass
+class OutputSpec:
+    """One deliverable of a build; ``size`` defaults to the source size."""
+
+    path: Path
+    size: Optional[Tuple[int, int]] = None
+    codec: str = "mp4v"
+    fps: int = 30
+
+
+def _pyramid(sizes: List[Tuple[int, int]]) -> List[int]:
+    """Return output indices from the largest to the smallest frame area.
+
+    Each output is resized from the one before it in this order when that
+    covers both of its dimensions (see :func:`_covers`), so every resize
+    works on the smallest frame that still covers it.
+    """
+    return sorted(range(len(sizes)), key=lambda i: sizes[i][0] * sizes[i][1], reverse=True)
+
+
+def _covers(size: Tuple[int, int], target: Tuple[int, int]) -> bool:
+    return size[0] >= target[0] and size[1] >= target[1]
 
 
 def build_video(
@@ -25,40 +148,160 @@ def build_video(
     size: Optional[Tuple[int, int]] = None,
     strict: bool = False,
     dry_run: bool = False,
+    flat_threshold: Optional[float] = None,
+    decode_workers: int = 0,
+    queue_depth: Optional[int] = None,
+    decode_pool: Optional[Executor] = None,
+    frame_cache: Optional["FrameCache"] = None,
+    deflicker_window: Optional[int] = None,
+    max_gain: float = DEFAULT_MAX_GAIN,
 ) -> BuildReport:
-    """Build a timelapse video from *images*."""
-    images = [img for img in images if img.is_valid]
-    if not images:
-        raise ValueError("no valid images to build video")
+    """Build a timelapse video from *images*.
+
+    *images* is consumed lazily, so it may be a generator chained to the
+    folder scan: the first frame is written as soon as it is validated and
+    memory does not grow with the number of frames.
+
+    Each image is decoded exactly once.  The output size defaults to the
+    dimensions recorded during validation, and flat-frame statistics
+    (``flat_threshold``) are computed on the buffer that is encoded, so the
+    scan feeding this function only needs header checks.
+
+    With ``decode_workers`` greater than zero, frames are decoded and resized
+    on a thread pool feeding a bounded, order-preserving queue of
+    ``queue_depth`` frames that the single writer drains.  The report's
+    stall count and timings show whether the build is decode- or
+    encode-bound.  ``decode_pool`` shares an existing executor instead.
+
+    With a :class:`~timelapse_tool.framecache.FrameCache`, frames decoded
+    at this output size by an earlier build are read from its memory-mapped
+    files, so a repeat render at another fps, codec or sampling only pays
+    for encoding.
 
-    frames_written = 0
-    skipped = 0
+    ``deflicker_window`` evens out exposure changes: each frame is scaled
+    towards the rolling mean brightness of that many neighbouring frames
+    (see :mod:`~timelapse_tool.deflicker`), by at most ``max_gain``.  The
+    brightness comes from validation with ``quality=True``, so the only
+    per-frame cost here is one lookup-table pass over the encoded frame.
+    The image records, but no pixels, are then held in memory.
+    """
+    return build_videos(
+        images,
+        [OutputSpec(output, size, codec, fps)],
+        strict=strict,
+        dry_run=dry_run,
+        flat_threshold=flat_threshold,
+        decode_workers=decode_workers,
+        queue_depth=queue_depth,
+        decode_pool=decode_pool,
+        frame_cache=frame_cache,
+        deflicker_window=deflicker_window,
+        max_gain=max_gain,
+    )[0]
 
-    if size is None:
-        first = cv2.imread(str(images[0].path))
+
+def build_videos(
+    images: Iterable[ImageValidationResult],
+    outputs: Sequence[OutputSpec],
+    strict: bool = False,
+    dry_run: bool = False,
+    flat_threshold: Optional[float] = None,
+    decode_workers: int = 0,
+    queue_depth: Optional[int] = None,
+    decode_pool: Optional[Executor] = None,
+    frame_cache: Optional["FrameCache"] = None,
+    deflicker_window: Optional[int] = None,
+    max_gain: float = DEFAULT_MAX_GAIN,
+) -> List[BuildReport]:
+    """Encode *images* to several *outputs* in a single decode pass.
+
+    Frames are decoded once, at the largest output size, and fanned out to
+    one ``cv2.VideoWriter`` per output.  Smaller outputs are resized from
+    the next larger one (see :func:`_pyramid`) rather than from the decoded
+    frame, unless a different aspect ratio means it does not cover them.
+    With mixed aspect ratios, frames are decoded at the widest width and
+    tallest height of all outputs, so no output is upscaled.  One report is
+    returned per output, in the order of *outputs*; the decode figures are
+    shared.  The other arguments are as for :func:`build_video`.
+    """
+    if not outputs:
+        raise ValueError("no outputs to build")
+    valid = (img for img in images if img.is_valid)
+    first_img = next(valid, None)
+    if first_img is None:
+        raise ValueError("no valid images to build video")
+    images = chain([first_img], valid)
+    gains: Iterator[float] = iter(())
+    if deflicker_window:
+        # the target curve spans the whole sequence, so the records are listed
+        images = list(images)
+        brightness = brightness_of(images)
+        if np.isnan(brightness).all():
+            raise ValueError("deflicker needs the brightness recorded by quality validation")
+        gains = iter(deflicker_gains(brightness, deflicker_window, max_gain).tolist())
+
+    source = None
+    if first_img.width and first_img.height:
+        source = (first_img.width, first_img.height)
+    elif any(o.size is None for o in outputs):
+        first = cv2.imread(str(first_img.path))
         if first is None:
             raise ValueError("cannot read first image")
         h, w = first.shape[:2]
-        size = (w, h)
-
-    writer = None if dry_run else cv2.VideoWriter(
-        str(output), cv2.VideoWriter_fourcc(*codec), fps, size
-    )
-
-    for img in images:
-        frame = cv2.imread(str(img.path))
-        if frame is None or frame.size == 0:
-            if strict:
-                raise ValueError(f"unreadable image {img.path}")
-            skipped += 1
-            continue
-        if (frame.shape[1], frame.shape[0]) != size:
-            frame = cv2.resize(frame, size)
-        if not dry_run:
-            writer.write(frame)
-        frames_written += 1
+        source = (w, h)
+    sizes = [o.size or source for o in outputs]  # type: ignore[misc]
+    order = _pyramid(sizes)  # type: ignore[arg-type]
+    # the union of all sizes, which is the largest output unless aspect ratios differ
+    decode_size = (max(w for w, _ in sizes), max(h for _, h in sizes))  # type: ignore[misc]
+
+    decode = BuildReport(frames_written=0, skipped=0)
+    reports = [BuildReport(frames_written=0, skipped=0) for _ in outputs]
+    writers = [] if dry_run else [
+        cv2.VideoWriter(str(o.path), cv2.VideoWriter_fourcc(*o.codec), o.fps, s)
+        for o, s in zip(outputs, sizes)
+    ]
 
-    if writer is not None:
-        writer.release()
+    try:
+        for img, frame in _iter_frames(
+            images, decode_size, decode_workers, queue_depth, decode, decode_pool, frame_cache
+        ):
+            gain = next(gains, 1.0)
+            if frame is None:
+                if strict:
+                    raise ValueError(f"unreadable image {img.path}")
+                decode.skipped += 1
+                continue
+            if flat_threshold is not None:
+                with timed("flat"):
+                    flat = frame_is_flat(frame, flat_threshold)
+                decode.flat += flat
+            decode.frames_written += 1
+            if not writers:
+                continue
+            if gain != 1.0:
+                with timed("deflicker"):
+                    frame = cv2.LUT(frame, gain_lut(gain))
+            scaled = frame
+            for i in order:
+                current = (scaled.shape[1], scaled.shape[0])
+                if current != sizes[i]:
+                    source = scaled if _covers(current, sizes[i]) else frame
+                    with timed("resize"):
+                        scaled = cv2.resize(source, sizes[i], interpolation=cv2.INTER_AREA)
+                start = time.perf_counter()
+                writers[i].write(scaled)
+                elapsed = time.perf_counter() - start
+                reports[i].encode_seconds += elapsed
+                if METRICS.enabled:
+                    METRICS.add("encode", elapsed)
+    finally:
+        for writer in writers:
+            writer.release()
 
-    return BuildReport(frames_written=frames_written, skipped=skipped)
+    for r in reports:
+        r.frames_written = decode.frames_written
+        r.skipped = decode.skipped
+        r.flat = decode.flat
+        r.stalls = decode.stalls
+        r.decode_wait_seconds = decode.decode_wait_seconds
+    return reports
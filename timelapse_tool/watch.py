@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+"""Follow a camera folder and validate frames as they are written."""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Protocol,
+    Tuple,
+)
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+from .gaps import Gap
+from .parsing import parse_timestamp
+from .validate import ImageValidationResult
+
+if TYPE_CHECKING:
+    import cv2
+
+# inotify(7) constants
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+class Watcher(Protocol):
+    def poll(self, timeout: float) -> List[Path]:
+        """Return files completed since the last call, waiting up to *timeout*."""
+
+    def close(self) -> None:
+        ...
+
+
+class InotifyWatcher:
+    """Report files closed after writing or moved into *folder* (Linux only)."""
+
+    def __init__(self, folder: Path) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or libc_name is None:
+            raise OSError("inotify is not available")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.folder = folder
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(folder), _IN_CLOSE_WRITE | _IN_MOVED_TO
+        )
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, f"cannot watch {folder}")
+
+    def poll(self, timeout: float) -> List[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return [self.folder / n for n in sorted(set(names))]
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Portable fallback that lists *folder* periodically.
+
+    A new file is reported once its size is unchanged between two polls, so
+    frames still being written by the camera are not picked up half-way.
+    """
+
+    def __init__(self, folder: Path, ignore_existing: bool = True) -> None:
+        self.folder = folder
+        self._seen = set(self._list()) if ignore_existing else set()
+        self._pending: Dict[str, int] = {}
+
+    def _list(self) -> Dict[str, int]:
+        sizes = {}
+        with os.scandir(self.folder) as it:
+            for e in it:
+                try:
+                    if e.is_file():
+                        sizes[e.name] = e.stat().st_size
+                except OSError:
+                    continue
+        return sizes
+
+    def poll(self, timeout: float) -> List[Path]:
+        if timeout:
+            time.sleep(timeout)
+        ready = []
+        for name, size in self._list().items():
+            if name in self._seen:
+                continue
+            if self._pending.get(name) == size:
+                ready.append(name)
+                self._seen.add(name)
+                del self._pending[name]
+            else:
+                self._pending[name] = size
+        return [self.folder / n for n in sorted(ready)]
+
+    def close(self) -> None:
+        pass
+
+
+def make_watcher(folder: Path, polling: bool = False) -> Watcher:
+    """Return an inotify watcher, or a polling one if inotify is unavailable."""
+    if not polling:
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as exc:
+            logging.info("inotify unavailable (%s), polling instead", exc)
+    return PollingWatcher(folder)
+
+
+def latest_timestamp(
+    folder: Path, pattern: Pattern[str], ts_format: str
+) -> Optional[Tuple[Path, datetime]]:
+    """Return the newest file of *folder* judged by its name alone."""
+    newest = None
+    with os.scandir(folder) as it:
+        for e in it:
+            ts = parse_timestamp(e.name, pattern, ts_format).timestamp
+            if ts is not None and (newest is None or ts > newest[1]):
+                newest = (Path(e.path), ts)
+    return newest
+
+
+@dataclass
+class GapTracker:
+    """Incremental counterpart of :func:`~timelapse_tool.gaps.find_gaps`.
+
+    Valid frames are fed one at a time in arrival order.  :meth:`add` returns
+    the closed :class:`Gap` when a frame ends a gap larger than
+    ``gap_minutes``; :meth:`check_open` reports a gap that is still open,
+    once, so alerts fire while the camera is down rather than when it
+    recovers.  Frames older than the newest one seen are ignored.
+    """
+
+    gap_minutes: float
+    last_file: Optional[Path] = None
+    last_ts: Optional[datetime] = None
+    _alerted: bool = field(default=False, repr=False)
+
+    def add(self, result: ImageValidationResult) -> Optional[Gap]:
+        if not result.is_valid or result.timestamp is None:
+            return None
+        if self.last_ts is not None and result.timestamp <= self.last_ts:
+            return None
+        gap = None
+        if self.last_ts is not None and self.last_file is not None:
+            delta = (result.timestamp - self.last_ts).total_seconds() / 60.0
+            if delta > self.gap_minutes:
+                gap = Gap(self.last_file, self.last_ts, result.path, result.timestamp, delta)
+        self.last_file, self.last_ts = result.path, result.timestamp
+        self._alerted = False
+        return gap
+
+    def check_open(self, now: datetime) -> Optional[float]:
+        """Return the minutes since the last frame if a new gap just opened."""
+        if self.last_ts is None or self._alerted:
+            return None
+        open_minutes = (now - self.last_ts).total_seconds() / 60.0
+        if open_minutes > self.gap_minutes:
+            self._alerted = True
+            return open_minutes
+        return None
+
+
+class SegmentWriter:
+    """Append frames to a rolling series of fixed-length video segments."""
+
+    def __init__(
+        self,
+        folder: Path,
+        frames_per_segment: int,
+        fps: int,
+        codec: str,
+        size: Optional[Tuple[int, int]] = None,
+        suffix: str = ".mp4",
+    ) -> None:
+        folder.mkdir(parents=True, exist_ok=True)
+        self.folder = folder
+        self.frames_per_segment = frames_per_segment
+        self.fps = fps
+        self.codec = codec
+        self.size = size
+        self.suffix = suffix
+        self.segments: List[Path] = []
+        # continue numbering after segments left by a previous run
+        self._next_index = len(list(folder.glob(f"segment_*{suffix}")))
+        self._writer: Optional[cv2.VideoWriter] = None
+        self._frames = 0
+
+    def add(self, path: Path) -> bool:
+        # OpenCV is only loaded once a segment is actually written
+        import cv2
+
+        frame = cv2.imread(str(path))
+        if frame is None or frame.size == 0:
+            return False
+        if self.size is None:
+            self.size = (frame.shape[1], frame.shape[0])
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        if self._writer is None:
+            out = self.folder / f"segment_{self._next_index:05d}{self.suffix}"
+            self._next_index += 1
+            self._writer = cv2.VideoWriter(
+                str(out), cv2.VideoWriter_fourcc(*self.codec), self.fps, self.size
+            )
+            self.segments.append(out)
+        self._writer.write(frame)
+        self._frames += 1
+        if self._frames >= self.frames_per_segment:
+            self.close()
+        return True
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+            self._frames = 0
+
+
+def watch(
+    watcher: Watcher,
+    check: Callable[[Path], ImageValidationResult],
+    tracker: GapTracker,
+    on_result: Callable[[ImageValidationResult, Optional[Gap]], None],
+    on_open_gap: Callable[[float], None],
+    poll_interval: float = 1.0,
+    clock: Callable[[], datetime] = datetime.now,
+    stop: Callable[[], bool] = lambda: False,
+) -> Iterator[ImageValidationResult]:
+    """Validate new files reported by *watcher* until *stop* returns ``True``.
+
+    Only new files are validated, so each iteration costs O(new files)
+    rather than a rescan of the folder.  Every result is also yielded.
+    """
+    while not stop():
+        for path in watcher.poll(poll_interval):
+            result = check(path)
+            on_result(result, tracker.add(result))
+            yield result
+        open_minutes = tracker.check_open(clock())
+        if open_minutes is not None:
+            on_open_gap(open_minutes)
+
+
+def deadline(seconds: Optional[float]) -> Callable[[], bool]:
+    """Return a stop callback that fires after *seconds* (never if ``None``)."""
+    if seconds is None:
+        return lambda: False
+    end = time.monotonic() + seconds
+    return lambda: time.monotonic() >= end
+